@@ -0,0 +1,109 @@
+import numpy as np
+
+class Analytics:
+    """
+    回测结果分析：由价格、每日总资产、持仓等numpy数组向量化地计算收益曲线和各项绩效指标。
+    """
+
+    def __init__(self, periods_per_year=365):
+        """
+        参数:
+            periods_per_year (int): 每年的周期数，用于年化夏普比率和索提诺比率。生成的数据包含每一个自然日，默认365。
+        """
+        self.periods_per_year = periods_per_year
+
+    def max_profit_curve(self, prices, balance):
+        """理想情况下（每次上涨都持有）每单位持仓的最大累计收益，乘以 balance 得到收益曲线。"""
+        prices = np.asarray(prices, dtype=np.float64)
+        gains = np.maximum(np.diff(prices), 0)
+        return np.concatenate(([0.0], np.cumsum(gains))) * balance
+
+    def buy_and_hold_curve(self, prices, initial_balance):
+        """第一天全部资金买入并一直持有的资产曲线。"""
+        prices = np.asarray(prices, dtype=np.float64)
+        return prices * (initial_balance / prices[0])
+
+    def market_trend(self, prices):
+        """相对第一天价格的涨跌幅曲线。"""
+        prices = np.asarray(prices, dtype=np.float64)
+        return prices / prices[0] - 1
+
+    def cumulative_return(self, total_asset, initial_balance):
+        """相对初始资金的累计收益率曲线。"""
+        return np.asarray(total_asset, dtype=np.float64) / initial_balance - 1
+
+    def period_returns(self, total_asset):
+        """每个周期的简单收益率。"""
+        total_asset = np.asarray(total_asset, dtype=np.float64)
+        return total_asset[1:] / total_asset[:-1] - 1
+
+    def drawdown(self, total_asset):
+        """每个时刻相对历史最高点的回撤（非正数）。"""
+        total_asset = np.asarray(total_asset, dtype=np.float64)
+        return total_asset / np.maximum.accumulate(total_asset) - 1
+
+    def max_drawdown(self, total_asset):
+        """最大回撤（非正数），例如-0.2表示最多从高点回落20%。"""
+        if len(total_asset) == 0:
+            return 0.0
+        return float(self.drawdown(total_asset).min())
+
+    def sharpe_ratio(self, total_asset, risk_free_rate=0.0):
+        """年化夏普比率，risk_free_rate 为每周期的无风险收益率。"""
+        excess = self.period_returns(total_asset) - risk_free_rate
+        std = excess.std() if len(excess) else 0.0
+        if std == 0:
+            return 0.0
+        return float(excess.mean() / std * np.sqrt(self.periods_per_year))
+
+    def sortino_ratio(self, total_asset, risk_free_rate=0.0):
+        """年化索提诺比率，只用下行波动作为风险。"""
+        excess = self.period_returns(total_asset) - risk_free_rate
+        downside = np.sqrt(np.mean(np.minimum(excess, 0) ** 2)) if len(excess) else 0.0
+        if downside == 0:
+            return 0.0
+        return float(excess.mean() / downside * np.sqrt(self.periods_per_year))
+
+    def win_rate(self, total_asset):
+        """资产发生变化的周期中，上涨周期所占的比例。"""
+        returns = self.period_returns(total_asset)
+        changed = np.count_nonzero(returns)
+        if changed == 0:
+            return 0.0
+        return float(np.count_nonzero(returns > 0) / changed)
+
+    def turnover(self, prices, holdings, total_asset):
+        """换手率：累计成交金额除以平均总资产。holdings 为每个周期交易后的持仓数量。"""
+        prices = np.asarray(prices, dtype=np.float64)
+        trades = np.abs(np.diff(np.asarray(holdings, dtype=np.float64), prepend=0))
+        mean_asset = np.mean(total_asset) if len(total_asset) else 0.0
+        if mean_asset == 0:
+            return 0.0
+        return float(np.sum(trades * prices) / mean_asset)
+
+    def summary(self, prices, total_asset, holdings, initial_balance):
+        """
+        汇总回测的主要指标。
+
+        参数:
+            prices (array-like): 每个周期的股价。
+            total_asset (array-like): 每个周期交易后的总资产。
+            holdings (array-like): 每个周期交易后的持仓数量。
+            initial_balance (float): 初始资金。
+
+        返回:
+            metrics (dict): 最终收益、累计收益率、买入持有收益率、理想最大收益（初始资金按第一天价格折算的股数，只在上涨时持有）、最大回撤、夏普比率、索提诺比率、胜率和换手率。
+        """
+        total_asset = np.asarray(total_asset, dtype=np.float64)
+        prices = np.asarray(prices, dtype=np.float64)
+        return {
+            "final_profit": float(total_asset[-1] - initial_balance),
+            "cumulative_return": float(total_asset[-1] / initial_balance - 1),
+            "buy_and_hold_return": float(prices[-1] / prices[0] - 1),
+            "max_profit": float(self.max_profit_curve(prices, initial_balance / prices[0])[-1]),
+            "max_drawdown": self.max_drawdown(total_asset),
+            "sharpe_ratio": self.sharpe_ratio(total_asset),
+            "sortino_ratio": self.sortino_ratio(total_asset),
+            "win_rate": self.win_rate(total_asset),
+            "turnover": self.turnover(prices, holdings, total_asset),
+        }
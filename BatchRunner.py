@@ -0,0 +1,159 @@
+import argparse
+import json
+import os
+import time
+import pandas as pd
+from Analytics import Analytics
+from DataGenerationAndManagementClass import DataGenerationAndManagementClass
+from DatasetRegistry import get_default_registry
+from FeatureStore import FeatureStore
+from FileIOClass import FileIOClass
+from InputHandler import InputHandler
+from StockLogger import StockLogger
+from TrainingPipeline import TrainingPipeline
+
+class BatchRunner:
+    """
+    非交互的批量实验：从配置文件读取一组任务，在同一个进程中依次训练和回测。
+
+    torch、stable_baselines3 等库只导入一次，相同配置的生成数据只生成一次并以内存映射方式复用。
+    """
+
+    def __init__(self, data_dir="batch_data", verbose=0):
+        """
+        参数:
+            data_dir (str): 生成数据和特征矩阵的保存目录。
+            verbose (int): stable_baselines3 的日志级别。
+        """
+        self.data_dir = data_dir
+        self.verbose = verbose
+        self.handler = InputHandler()
+        self.data_generator = DataGenerationAndManagementClass()
+        self.file_io = FileIOClass()
+        self.analytics = Analytics()
+        self.registry = get_default_registry()
+        self.feature_store = FeatureStore(os.path.join(data_dir, "features"))
+        self._files = {}
+
+    def load_jobs(self, config_file):
+        """
+        读取并校验配置文件。
+
+        配置格式：
+            {"defaults": {"model_choice": "DQN", "total_timesteps": 50000, "parameters": {...}},
+             "jobs": [{"name": "aapl_dqn",
+                       "train": {"stock_symbol": "AAPL", "start_date": "2020-01-01", "end_date": "2022-12-31", "seed": 1},
+                       "test": {"stock_symbol": "AAPL", "start_date": "2023-01-01", "end_date": "2023-12-31", "seed": 2},
+                       "model_choice": "PPO", "learning_rate": 0.0003,
+                       "parameters": {"initial_balance": 10000, "fee_rate": 0.001, "invest_ratio": 0.5,
+                                      "rebalance_period": 1, "max_stocks": "inf"},
+                       "log_file": "aapl_ppo_logs.jsonl"}]}
+            任务中未给出的字段使用 defaults 中的值；train/test 中还可以指定 trend_type。
+            log_file 以 .csv 结尾时交易日志写为CSV，否则写为JSONL。
+            features 为 FeatureStore 的特征配置（{} 表示默认配置），指定时特征矩阵只计算一次并在任务之间共享。
+
+        返回:
+            jobs (list): 校验后的任务列表。
+        """
+        with open(config_file) as file:
+            config = json.load(file)
+        defaults = config.get("defaults", {})
+        return [self.validate_job(dict(defaults, **job), i) for i, job in enumerate(config["jobs"])]
+
+    def validate_job(self, job, number=0):
+        """复用 InputHandler 的校验规则检查一个任务，出错时指出是哪个任务。"""
+        name = job.get("name", f"job_{number}")
+        try:
+            validated = {
+                "name": name,
+                "model_choice": self.handler.validate_model_choice(job["model_choice"]),
+                "learning_rate": job.get("learning_rate"),
+                "total_timesteps": int(job.get("total_timesteps", 50000)),
+                "parameters": self.handler.validate_portfolio_parameters(job["parameters"]),
+                "log_file": job.get("log_file"),
+                "features": job.get("features"),
+            }
+            for data_type in ("train", "test"):
+                data = dict(job[data_type])
+                validated[data_type] = dict(data, **self.handler.validate_data_inputs(data))
+        except (KeyError, ValueError) as e:
+            raise ValueError(f"任务 {name} 配置错误：{e}")
+        return validated
+
+    def get_dataset(self, data):
+        """按 (股票代码, 日期范围, 趋势, 种子) 生成数据，同一配置只生成一次，打开的数据由注册表按LRU管理。"""
+        key = (data["stock_symbol"], data["start_date"], data["end_date"], data.get("trend_type", "random"),
+               data.get("seed"))
+        if key not in self._files:
+            os.makedirs(self.data_dir, exist_ok=True)
+            file_path = os.path.join(self.data_dir, "_".join(str(part) for part in key) + ".stk")
+            generated = self.data_generator.generate_stock_data_vectorized(data["stock_symbol"], data["start_date"],
+                                                                          data["end_date"], trend_type=key[3],
+                                                                          seed=key[4])
+            self.file_io.write_columnar(generated, file_path)
+            self._files[key] = file_path
+        file_path = self._files[key]
+        return file_path, self.registry.get(file_path).as_dataset()
+
+    def run_job(self, job):
+        """训练并回测一个任务，返回任务信息和回测指标。"""
+        start = time.perf_counter()
+        _, train_dataset = self.get_dataset(job["train"])
+        test_file, test_dataset = self.get_dataset(job["test"])
+
+        parameters = job["parameters"]
+        pipeline = TrainingPipeline(job["model_choice"], parameters, learning_rate=job["learning_rate"],
+                                    total_timesteps=job["total_timesteps"], verbose=self.verbose,
+                                    features=job["features"], feature_store=self.feature_store)
+        model = pipeline.train(train_dataset.drop(columns=['Date', 'Index']))
+        result = pipeline.backtest(model, test_dataset.drop(columns=['Date', 'Index']))
+
+        prices = test_dataset['Close'][result['days']]
+        metrics = self.analytics.summary(prices, result['total_asset'], result['portfolios'],
+                                         parameters['initial_balance'])
+        if job["log_file"]:
+            # 批量任务不逐行打印，直接以结构化格式写入日志文件
+            logger = StockLogger(test_file)
+            logger.write_trade_log(prices, result['portfolios'], result['days'], result['total_asset'],
+                                   parameters['initial_balance'], job["test"]["stock_symbol"], job["log_file"],
+                                   fmt="csv" if job["log_file"].endswith(".csv") else "jsonl")
+
+        row = {"name": job["name"], "model_choice": job["model_choice"],
+               "train_symbol": job["train"]["stock_symbol"], "test_symbol": job["test"]["stock_symbol"]}
+        row.update(parameters)
+        row.update(metrics)
+        row["seconds"] = time.perf_counter() - start
+        return row
+
+    def run(self, jobs, output_file=None):
+        """
+        依次运行所有任务，单个任务失败不影响后续任务。
+
+        返回:
+            results (pd.DataFrame): 每行一个任务的参数和回测指标，失败的任务记录在error列。
+        """
+        rows = []
+        for i, job in enumerate(jobs):
+            print(f"开始任务 {i + 1}/{len(jobs)}：{job['name']}")
+            try:
+                rows.append(self.run_job(job))
+            except Exception as e:
+                print(f"任务 {job['name']} 失败：{e}")
+                rows.append({"name": job["name"], "error": repr(e)})
+        results = pd.DataFrame(rows)
+        if output_file:
+            results.to_csv(output_file, index=False)
+        return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="按配置文件批量训练和回测，不需要交互输入")
+    parser.add_argument("config", help="任务配置JSON文件，格式见 BatchRunner.load_jobs")
+    parser.add_argument("--output", default="batch_results.csv", help="结果表保存路径")
+    parser.add_argument("--data-dir", default="batch_data", help="生成数据的保存目录")
+    parser.add_argument("--verbose", type=int, default=0, help="stable_baselines3 的日志级别")
+    args = parser.parse_args()
+
+    runner = BatchRunner(data_dir=args.data_dir, verbose=args.verbose)
+    results = runner.run(runner.load_jobs(args.config), output_file=args.output)
+    print(results)
@@ -0,0 +1,236 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+from DataGenerationAndManagementClass import DataGenerationAndManagementClass
+from DatasetRegistry import DatasetRegistry
+from DQNEnv import DQNEnv
+from FileIOClass import FileIOClass
+from PPOEnv import PPOEnv
+from StockLogger import StockLogger
+from Visualization import Visualizer
+
+# 数据规模：名称 -> 生成的交易日数（生成的数据包含每一个自然日）
+SIZES = {
+    "1y": 365,
+    "10y": 3652,
+    "1m": 1000000,
+}
+
+# 随机游走的价格在十万天量级会漂到0以下（开盘价被截为0，无法买入）。读写、环境、日志和绘图测试使用的
+# 更长数据由一段 TILE_DAYS 天的生成数据重复拼接而成，价格保持在真实范围内；generation 测试仍按真实长度生成
+TILE_DAYS = SIZES["10y"]
+
+BENCHMARKS = ("generation", "write_columnar", "open_columnar", "read_csv", "dqn_env", "ppo_env", "trade_log",
+              "plot")
+
+
+class Benchmark:
+    """
+    离线、可复现的基准测试：在不同数据规模下测量数据生成、读写、环境步进、日志和绘图的吞吐量与峰值内存，
+    结果保存为JSON，并可与保存的基线比较以发现性能回退。
+    """
+
+    def __init__(self, repeat=3, seed=0, work_dir=None):
+        """
+        参数:
+            repeat (int): 每项测量的重复次数，取最快的一次作为耗时。
+            seed (int): 生成数据和随机动作的种子，保证每次测量使用相同的输入。
+            work_dir (str): 临时文件目录，默认使用系统临时目录。
+        """
+        self.repeat = repeat
+        self.seed = seed
+        self.work_dir = work_dir or tempfile.mkdtemp(prefix="stock_bench_")
+        os.makedirs(self.work_dir, exist_ok=True)
+        self.data_generator = DataGenerationAndManagementClass()
+        self.file_io = FileIOClass()
+        self.visualizer = Visualizer()
+
+    def _generate(self, start, n_days):
+        """生成从 start 开始的 n_days 天数据；超过 TILE_DAYS 天时重复拼接，日期和序号仍然连续。"""
+        block = min(n_days, TILE_DAYS)
+        data = self.data_generator.generate_stock_data_vectorized("BENCH", str(start), str(start + block - 1),
+                                                                  seed=self.seed)
+        if n_days == block:
+            return data
+        repeats = -(-n_days // block)
+        columns = {name: np.tile(data[name].to_numpy(), repeats)[:n_days] for name in data.columns}
+        columns["Date"] = np.datetime_as_string(np.arange(start, start + n_days), unit='D')
+        columns["Index"] = np.arange(1, n_days + 1)
+        return pd.DataFrame(columns, columns=data.columns)
+
+    def _prepare(self, n_days):
+        """生成一份数据并写成列式文件和CSV文件，供各项测试共用。"""
+        start = np.datetime64("1900-01-01")
+        data = self._generate(start, n_days)
+        stk_file = os.path.join(self.work_dir, f"bench_{n_days}.stk")
+        csv_file = os.path.join(self.work_dir, f"bench_{n_days}.csv")
+        if not self.file_io.write_columnar(data, stk_file):
+            raise OSError(f"无法写入 {stk_file}。")
+        if not self.data_generator.save_data_to_csv(data, csv_file):
+            raise OSError(f"无法写入 {csv_file}。")
+        actions = np.random.default_rng(self.seed).integers(0, 3, n_days)
+        return {"n_days": n_days, "start": start, "data": data, "stk_file": stk_file,
+                "csv_file": csv_file, "actions": actions}
+
+    # 每个 bench_* 方法执行一次被测操作，返回处理的条数（行数、步数或点数）
+
+    def bench_generation(self, case):
+        # 按真实长度生成，测量生成器本身；长数据的价格漂移不影响生成的吞吐量，因此不重复拼接
+        start = case["start"]
+        self.data_generator.generate_stock_data_vectorized("BENCH", str(start), str(start + case["n_days"] - 1),
+                                                           seed=self.seed)
+        return case["n_days"]
+
+    def bench_write_columnar(self, case):
+        output_file = os.path.join(self.work_dir, "bench_write.stk")
+        if not self.file_io.write_columnar(case["data"], output_file):
+            raise OSError(f"无法写入 {output_file}。")
+        return case["n_days"]
+
+    def bench_open_columnar(self, case):
+        # 打开并完整读取收盘价，避免只测到内存映射本身
+        dataset = self.file_io.open_columnar(case["stk_file"])
+        float(np.sum(dataset["Close"]))
+        return case["n_days"]
+
+    def bench_read_csv(self, case):
+        rows = 0
+        for chunk in self.file_io.read_historical_data(case["csv_file"], chunk_size=100000):
+            rows += len(chunk)
+        return rows
+
+    def _run_env(self, env, actions):
+        env.reset()
+        steps = 0
+        done = False
+        while not done:
+            done = env.step(actions[steps])[2]
+            steps += 1
+        return steps
+
+    def bench_dqn_env(self, case):
+        data = self.file_io.open_columnar(case["stk_file"]).drop(columns=['Date', 'Index'])
+        return self._run_env(DQNEnv(data, fee_rate=0.001), case["actions"])
+
+    def bench_ppo_env(self, case):
+        data = self.file_io.open_columnar(case["stk_file"]).drop(columns=['Date', 'Index'])
+        return self._run_env(PPOEnv(data), case["actions"])
+
+    def bench_trade_log(self, case):
+        n = case["n_days"]
+        prices = case["data"]["Close"].to_numpy()
+        holdings = np.cumsum(case["actions"] == 0) - np.cumsum(case["actions"] == 1)
+        total_value = 10000 + np.cumsum(np.diff(prices, prepend=prices[0]))
+        # 使用独立的注册表，避免前一次测量的缓存影响结果
+        logger = StockLogger(case["stk_file"], registry=DatasetRegistry())
+        logger.write_trade_log(prices, holdings, np.arange(n), total_value, 10000, "BENCH",
+                               os.path.join(self.work_dir, "bench_log.jsonl"))
+        return n
+
+    def bench_plot(self, case):
+        prices = case["data"]["Close"].to_numpy()
+        total_asset = 10000 * prices / prices[0]
+        self.visualizer.render(prices, total_asset, np.arange(case["n_days"]), 10000,
+                               output_file=os.path.join(self.work_dir, "bench_plot.png"))
+        return case["n_days"]
+
+    def measure(self, name, case):
+        """测量一项基准：最快一次的耗时和吞吐量，以及单独一次运行的峰值内存（tracemalloc）。"""
+        bench = getattr(self, f"bench_{name}")
+        best = float('inf')
+        items = 0
+        for _ in range(self.repeat):
+            start = time.perf_counter()
+            items = bench(case)
+            best = min(best, time.perf_counter() - start)
+        tracemalloc.start()
+        try:
+            bench(case)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        return {"items": int(items), "seconds": best, "throughput": items / best if best > 0 else 0.0,
+                "peak_mb": peak / 2 ** 20}
+
+    def run(self, benchmarks=BENCHMARKS, sizes=tuple(SIZES)):
+        """
+        运行基准测试。
+
+        参数:
+            benchmarks (tuple): 要运行的项目，见 BENCHMARKS。
+            sizes (tuple): 数据规模名称，见 SIZES。
+
+        返回:
+            report (dict): meta 为运行环境信息，results 为 "项目/规模" -> 测量结果。
+        """
+        results = {}
+        for size in sizes:
+            case = self._prepare(SIZES[size])
+            for name in benchmarks:
+                result = self.measure(name, case)
+                results[f"{name}/{size}"] = result
+                print(f"{name}/{size}: {result['throughput']:,.0f} 条/秒, {result['seconds']:.4f} 秒, "
+                      f"峰值内存 {result['peak_mb']:.1f} MB")
+        return {"meta": self.meta(), "results": results}
+
+    def meta(self):
+        """记录运行环境，比较基线时用于判断结果是否可比。"""
+        return {"python": platform.python_version(), "numpy": np.__version__, "pandas": pd.__version__,
+                "machine": platform.machine(), "system": platform.system(), "repeat": self.repeat,
+                "seed": self.seed}
+
+    def save(self, report, output_file):
+        with open(output_file, "w") as file:
+            json.dump(report, file, indent=2)
+        print(f"基准结果已保存到 {output_file}")
+
+    def load(self, baseline_file):
+        with open(baseline_file) as file:
+            return json.load(file)
+
+    def compare(self, report, baseline, threshold=0.2):
+        """
+        与基线比较，吞吐量下降或峰值内存增加超过 threshold（比例）时记为回退。
+
+        返回:
+            regressions (list): 每个元素为 (项目, 指标, 基线值, 当前值)。
+        """
+        regressions = []
+        for key, result in report["results"].items():
+            base = baseline["results"].get(key)
+            if base is None:
+                continue
+            if result["throughput"] < base["throughput"] * (1 - threshold):
+                regressions.append((key, "throughput", base["throughput"], result["throughput"]))
+            if result["peak_mb"] > base["peak_mb"] * (1 + threshold) and result["peak_mb"] - base["peak_mb"] > 1:
+                regressions.append((key, "peak_mb", base["peak_mb"], result["peak_mb"]))
+        return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="数据生成、读写、环境步进、日志和绘图的基准测试")
+    parser.add_argument("--benchmarks", nargs="+", default=list(BENCHMARKS), choices=BENCHMARKS)
+    parser.add_argument("--sizes", nargs="+", default=list(SIZES), choices=list(SIZES))
+    parser.add_argument("--repeat", type=int, default=3, help="每项重复次数，取最快一次")
+    parser.add_argument("--output", default="benchmark.json", help="结果JSON保存路径")
+    parser.add_argument("--baseline", default=None, help="与之比较的基线JSON文件")
+    parser.add_argument("--threshold", type=float, default=0.2, help="判定回退的比例，默认20%%")
+    args = parser.parse_args()
+
+    benchmark = Benchmark(repeat=args.repeat)
+    report = benchmark.run(args.benchmarks, args.sizes)
+    benchmark.save(report, args.output)
+    if args.baseline:
+        regressions = benchmark.compare(report, benchmark.load(args.baseline), args.threshold)
+        for key, metric, base, current in regressions:
+            print(f"性能回退：{key} 的 {metric} 从 {base:.4g} 变为 {current:.4g}")
+        if regressions:
+            sys.exit(1)
+        print("没有发现性能回退")
@@ -1,15 +1,37 @@
 import numpy as np
 import gym
 from gym import spaces
+from OrderExecution import OrderExecutionEngine, mark_to_market
 
 class DQNEnv(gym.Env):
-    def __init__(self, data, initial_balance=10000, fee_rate=0, invest_ratio=1.0, rebalance_period=1, max_stocks=float('inf')):
+    def __init__(self, data, initial_balance=10000, fee_rate=0, invest_ratio=1.0, rebalance_period=1, max_stocks=float('inf'),
+                 observation_builder=None, feature_matrix=None, feature_bounds=None):
         super(DQNEnv, self).__init__()
         self.data = data
         self.initial_balance = initial_balance
         self.fee_rate = fee_rate  # 手续费率
         self.rebalance_period = rebalance_period  # 调仓周期
         self.max_stocks = max_stocks  # 最多持有股票数量
+        # 每次买入都使用全部余额，手续费和持仓上限由执行引擎统一处理
+        self.order_engine = OrderExecutionEngine(fee_rate=fee_rate, max_stocks=max_stocks)
+
+        self._n_steps = len(data)
+        if feature_matrix is not None:
+            # 使用预先计算的特征矩阵（例如 FeatureStore 的只读内存映射），直接按行切出观测
+            if len(feature_matrix) != self._n_steps:
+                raise ValueError("特征矩阵的行数必须与数据的行数相同。")
+            self._features = feature_matrix
+        else:
+            # 构造时一次性把DataFrame转换为连续的float32矩阵，避免每步用iloc索引
+            self._features = np.ascontiguousarray(data.to_numpy(dtype=np.float32))
+        self._n_features = self._features.shape[1]
+        # 收盘价单独保留float64副本，保证资金计算与原先逐行读取的结果完全一致（见 EquivalenceChecks.check_env_fast_path）
+        self._close = np.ascontiguousarray(data["Close"], dtype=np.float64)
+        # 可选的滚动技术指标（ObservationBuilder），拼接在观测的最后
+        self.observation_builder = observation_builder
+        n_indicators = observation_builder.n_features if observation_builder is not None else 0
+        # 预分配观测缓冲区：[行情特征..., 余额, 持仓, 技术指标...]
+        self._obs = np.zeros(self._n_features + 2 + n_indicators, dtype=np.float32)
 
         self.current_step = 0
         self.done = False
@@ -21,24 +43,38 @@ class DQNEnv(gym.Env):
         # 动作空间（买入、卖出、持有）
         self.action_space = spaces.Discrete(3)
 
-        # 状态空间（股票价格、持仓等）
-        self.observation_space = spaces.Box(
-            low=0, high=np.inf, shape=(len(data.columns) + 2,)
-        )
+        # 状态空间（股票价格、持仓、技术指标等）
+        low = np.zeros(self._obs.shape, dtype=np.float32)
+        high = np.full(self._obs.shape, np.inf, dtype=np.float32)
+        if feature_bounds is not None:
+            # 特征列的取值范围（例如 FeatureStore.bounds），默认与原始行情列相同的 [0, inf)
+            low[:self._n_features], high[:self._n_features] = feature_bounds
+        if n_indicators:
+            low[-n_indicators:] = observation_builder.low
+            high[-n_indicators:] = observation_builder.high
+        self.observation_space = spaces.Box(low=low, high=high, dtype=np.float32)
         self.reset()
 
     def step(self, action):
-        if self.current_step + self.rebalance_period > len(self.data) - 1:
+        if self.current_step + self.rebalance_period > self._n_steps - 1:
             reward = self._take_action(action)
             self.done = True
-            return self._next_observation(), reward, self.done, {"total_asset": self.total_value, "day": len(self.data) - 1, "portfolio": self.portfolio}
+            return self._next_observation(), reward, self.done, {"total_asset": self.total_value, "day": self._n_steps - 1, "portfolio": self.portfolio}
 
         day = self.current_step
         reward = self._take_action(action)
         self.current_step += self.rebalance_period
-        
+        if self.observation_builder is not None:
+            # 调仓周期中跳过的交易日也要计入指标
+            self.observation_builder.update_many(self._close[day + 1:self.current_step + 1].tolist())
+
         return self._next_observation(), reward, self.done, {"total_asset": self.total_value, "day": day, "portfolio": self.portfolio}
 
+    def seek(self, step):
+        """把当前步移到第 step 行并返回该行的观测（写入预分配的缓冲区），例如实时行情合并后直接在最新一行决策。"""
+        self.current_step = step
+        return self._next_observation()
+
     def reset(self):
         self.balance = self.initial_balance
         self.current_step = 0
@@ -46,35 +82,38 @@ class DQNEnv(gym.Env):
         self.portfolio = 0  # 当前持有的股票数量
         self.total_value = self.initial_balance
         self.last_rebalance_step = 0
-        return self._next_observation()
-
-    def _next_observation(self):
-        obs = list(self.data.iloc[self.current_step])
-        obs.append(self.balance)
-        obs.append(self.portfolio)
-        return np.array(obs)
+        if self.observation_builder is not None:
+            self.observation_builder.reset()
+            self.observation_builder.update(self._close[0])
+        # reset单独分配数组，避免覆盖向量化环境中仍被引用的终止观测
+        return self._next_observation(np.empty_like(self._obs))
+
+    def _next_observation(self, obs=None):
+        # 默认直接写入预分配的缓冲区，调用方如需保留观测请自行copy
+        if obs is None:
+            obs = self._obs
+        obs[:self._n_features] = self._features[self.current_step]
+        obs[self._n_features] = self.balance
+        obs[self._n_features + 1] = self.portfolio
+        if self.observation_builder is not None:
+            obs[self._n_features + 2:] = self.observation_builder.values
+        return obs
 
     def _take_action(self, action):
-        current_price = self.data.iloc[self.current_step]["Close"]
+        current_price = self._close[self.current_step]
         last_balance = self.balance
         last_portfolio = self.portfolio
 
-        # 计算可用资金和最多可购买的股票数量
-        max_buyable_stocks = min(self.balance // current_price, self.max_stocks - self.portfolio)
-
         # 执行买入或卖出动作
-        if action == 0 and max_buyable_stocks > 0:  # 买入
-            buy_quantity = int(max_buyable_stocks)
-            cost = buy_quantity * current_price * (1 + self.fee_rate)
-            while cost > self.balance:
-                buy_quantity -= 1
-                cost = buy_quantity * current_price * (1 + self.fee_rate)
-            self.portfolio += buy_quantity
-            self.balance -= cost
+        if action == 0:  # 买入：计入手续费后可负担的最大数量
+            buy_quantity = self.order_engine.buy_quantity(self.balance, current_price, self.portfolio)
+            if buy_quantity > 0:
+                self.portfolio += buy_quantity
+                self.balance -= self.order_engine.buy_cost(buy_quantity, current_price)
 
         elif action == 1 and self.portfolio > 0:  # 卖出
             sell_quantity = int(self.portfolio)
-            proceeds = sell_quantity * current_price * (1 - self.fee_rate)
+            proceeds = self.order_engine.sell_proceeds(sell_quantity, current_price)
             self.portfolio -= sell_quantity
             self.balance += proceeds
 
@@ -95,3 +134,12 @@ class DQNEnv(gym.Env):
         reward -= punish
 
         return reward
+
+    def equity_curve(self, total_asset, portfolios):
+        """
+        把一个完整回合中每次调仓的 total_asset、portfolios 展开为逐日记录，最后一次调仓的持仓持有到最后一天。
+
+        返回:
+            result (dict): 逐日的 days、total_asset、portfolios，可以直接传给 Visualizer 和 StockLogger。
+        """
+        return mark_to_market(self._close, total_asset, portfolios, self.rebalance_period, self._n_steps)
@@ -1,6 +1,8 @@
 import random
 import datetime
 import csv
+import numpy as np
+import pandas as pd
 
 class DataGenerationAndManagementClass:
     def __init__(self):
@@ -81,20 +83,167 @@ class DataGenerationAndManagementClass:
 
         return stock_data
 
+    def generate_stock_data_vectorized(self, stock_symbol, start_date, end_date, trend_type="random", seed=None,
+                                       as_dataframe=True):
+        """
+        generate_stock_data 的NumPy向量化版本，一次性生成整段Open/High/Low/Close/Volume序列，适合生成数十年的数据。
+
+        参数:
+            stock_symbol (str): 股票代码或者简称，用于标识股票。
+            start_date (str or datetime.date): 开始日期，可以是字符串格式'YYYY-MM-DD'或者datetime.date类型。
+            end_date (str or datetime.date): 结束日期，可以是字符串格式'YYYY-MM-DD'或者datetime.date类型。
+            trend_type (str): 生成的趋势类型，可选值为"upward"（总体上涨）、"downward"（总体下跌）或"random"（完全随机）。
+            seed (int or numpy.random.Generator): 随机数种子或生成器，相同的种子生成相同的数据。
+            as_dataframe (bool): 为True时返回DataFrame，否则返回按列组织的字典 {列名: numpy数组}。
+
+        返回:
+            stock_data (pd.DataFrame or dict): 列为Date, Index, Open, High, Low, Close, Volume的股票历史数据。
+        """
+        rng = seed if isinstance(seed, np.random.Generator) else np.random.default_rng(seed)
+        dates = np.arange(np.datetime64(start_date, 'D'), np.datetime64(end_date, 'D') + 1)
+        n = len(dates)
+
+        # 设置初始价格
+        initial_price = round(rng.uniform(50, 150), 2)
+        trend_factor = 0.05  # 用于控制总体趋势的上涨或下跌幅度
+        if trend_type == "upward":
+            trend = 1 + trend_factor  # 长期上涨趋势
+        elif trend_type == "downward":
+            trend = 1 - trend_factor  # 长期下跌趋势
+        else:
+            trend = 1.0
+
+        # 趋势与每日随机波动的累乘得到整段价格路径
+        daily_fluctuation = rng.uniform(0.95, 1.05, n)
+        open_price = np.round(initial_price * np.cumprod(daily_fluctuation * trend), 2)
+
+        stock_data = {
+            'Date': np.datetime_as_string(dates, unit='D'),
+            'Index': np.arange(1, n + 1),
+        }
+        stock_data.update(self._generate_bars(rng, open_price))
+        if as_dataframe:
+            return pd.DataFrame(stock_data)
+        return stock_data
+
+    def _generate_bars(self, rng, open_price):
+        """
+        根据开盘价数组（任意形状）向量化生成当天的High/Low/Close/Volume。
+
+        返回:
+            bars (dict): {'Open', 'High', 'Low', 'Close', 'Volume'} 到与open_price同形状数组的映射。
+        """
+        # 生成每天的价格波动
+        price_fluctuation = rng.uniform(0, 10, open_price.shape)
+        high_price = np.round(open_price + price_fluctuation, 2)
+        low_price = np.round(open_price - price_fluctuation, 2)
+        close_price = np.round(rng.uniform(low_price, high_price), 2)
+
+        # 确保High和Low为当天的最大最小值
+        high_price = np.maximum(np.maximum(open_price, high_price), np.maximum(low_price, close_price))
+        low_price = np.minimum(np.minimum(open_price, high_price), np.minimum(low_price, close_price))
+
+        # 生成随机成交量
+        volume = rng.integers(100, 10000, open_price.shape, endpoint=True)
+
+        return {'Open': open_price, 'High': high_price, 'Low': low_price, 'Close': close_price, 'Volume': volume}
+
+    def generate_panel_data(self, stock_symbols, start_date, end_date, file_path, correlation=0.3,
+                            trend_type="random", chunk_rows=1000000, seed=None):
+        """
+        生成多只股票相关联的历史数据（面板数据），按日期分块生成并逐块追加写入CSV文件，内存占用与总行数无关。
+
+        输出为长表格式，每行一只股票一天，列为Date, Symbol, Index, Open, High, Low, Close, Volume，按日期、股票排序。
+
+        参数:
+            stock_symbols (list): 股票代码列表。
+            start_date (str or datetime.date): 开始日期，可以是字符串格式'YYYY-MM-DD'或者datetime.date类型。
+            end_date (str or datetime.date): 结束日期，可以是字符串格式'YYYY-MM-DD'或者datetime.date类型。
+            file_path (str): CSV文件的保存路径。
+            correlation (float or array-like): 股票之间日波动的相关系数。取[0, 1)之间的数时使用单因子模型，
+                所有股票两两相关系数相同；也可以传入N×N的相关系数矩阵。
+            trend_type (str or list): 趋势类型"upward"、"downward"或"random"，也可以为每只股票分别指定。
+            chunk_rows (int): 每块大约包含的行数，决定内存上限。
+            seed (int or numpy.random.Generator): 随机数种子或生成器。
+
+        返回:
+            rows (int): 写入的数据行数。
+        """
+        rng = seed if isinstance(seed, np.random.Generator) else np.random.default_rng(seed)
+        symbols = np.asarray(stock_symbols, dtype=str)
+        n_symbols = len(symbols)
+        dates = np.arange(np.datetime64(start_date, 'D'), np.datetime64(end_date, 'D') + 1)
+        chunk_days = max(1, chunk_rows // n_symbols)
+
+        # 相关结构：标量使用单因子模型，矩阵使用Cholesky分解
+        correlation = np.asarray(correlation, dtype=np.float64)
+        if correlation.ndim == 0:
+            if not 0 <= correlation < 1:
+                raise ValueError("相关系数必须在 [0, 1) 范围内。")
+            cholesky = None
+        else:
+            if correlation.shape != (n_symbols, n_symbols):
+                raise ValueError("相关系数矩阵的形状必须与股票数量一致。")
+            cholesky = np.linalg.cholesky(correlation)
+
+        # 每只股票的趋势，与单只股票生成时的含义相同
+        trend_factor = 0.05
+        trend_types = [trend_type] * n_symbols if isinstance(trend_type, str) else list(trend_type)
+        trend = np.array([1 + trend_factor if t == "upward" else 1 - trend_factor if t == "downward" else 1.0
+                          for t in trend_types])
+
+        # 日波动与 uniform(0.95, 1.05) 同均值同标准差
+        volatility = 0.1 / np.sqrt(12)
+        current_price = np.round(rng.uniform(50, 150, n_symbols), 2)
+
+        rows = 0
+        with open(file_path, 'w', newline='') as csvfile:
+            for start in range(0, len(dates), chunk_days):
+                chunk_dates = dates[start:start + chunk_days]
+                n_days = len(chunk_dates)
+
+                # 生成相关的标准正态冲击
+                shocks = rng.standard_normal((n_days, n_symbols))
+                if cholesky is None:
+                    market = rng.standard_normal((n_days, 1))
+                    shocks = np.sqrt(correlation) * market + np.sqrt(1 - correlation) * shocks
+                else:
+                    shocks = shocks @ cholesky.T
+
+                # 在上一块的最后价格基础上累乘得到本块价格路径
+                path = current_price * np.cumprod((1 + volatility * shocks) * trend, axis=0)
+                current_price = path[-1]
+                bars = self._generate_bars(rng, np.round(path, 2))
+
+                chunk = {
+                    'Date': np.repeat(np.datetime_as_string(chunk_dates, unit='D'), n_symbols),
+                    'Symbol': np.tile(symbols, n_days),
+                    'Index': np.repeat(np.arange(start + 1, start + n_days + 1), n_symbols),
+                }
+                chunk.update({name: values.ravel() for name, values in bars.items()})
+                pd.DataFrame(chunk).to_csv(csvfile, header=(start == 0), index=False)
+                rows += n_days * n_symbols
+        return rows
+
     def save_data_to_csv(self, data, file_path):
         """
         将生成的股票数据保存到CSV文件中。
 
         参数:
-            data (list): 要保存的股票数据，格式为[{'Date': '2021-01-01', 'Open': 100, 'High': 105, 'Low': 98, 'Close': 102, 'Volume': 1000},...]
+            data (list, dict or pd.DataFrame): 要保存的股票数据，格式为[{'Date': '2021-01-01', 'Open': 100, 'High': 105, 'Low': 98, 'Close': 102, 'Volume': 1000},...]，
+                也可以是 generate_stock_data_vectorized 返回的DataFrame或按列组织的字典。
             file_path (str): CSV文件的保存路径。
 
         返回:
             bool: 如果保存成功返回True，否则返回False。
         """
+        fieldnames = ['Date', 'Index', 'Open', 'High', 'Low', 'Close', 'Volume']
         try:
+            if not isinstance(data, list):
+                # 按列组织的数据直接批量写出
+                pd.DataFrame(data).to_csv(file_path, columns=fieldnames, index=False)
+                return True
             with open(file_path, 'w', newline='') as csvfile:
-                fieldnames = ['Date', 'Index', 'Open', 'High', 'Low', 'Close', 'Volume']
                 writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
                 writer.writeheader()
                 for record in data:
@@ -0,0 +1,136 @@
+import os
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from FileIOClass import ColumnarDataset, FileIOClass
+
+class DatasetView:
+    """
+    已解析数据集的只读视图，由 DatasetRegistry 提供。所有返回的数组都不可写，多个使用者可以安全共享。
+    """
+
+    def __init__(self, file_path, arrays):
+        """
+        参数:
+            file_path (str): 数据文件路径。
+            arrays (dict): 列名到numpy数组的映射，Date列为datetime64[D]类型。
+        """
+        self.file_path = file_path
+        for array in arrays.values():
+            array.flags.writeable = False
+        self._arrays = arrays
+        self._features = None
+
+    @property
+    def columns(self):
+        return list(self._arrays)
+
+    @property
+    def dates(self):
+        """日期序列，没有Date列时为行号。"""
+        if 'Date' in self._arrays:
+            return self._arrays['Date']
+        return np.arange(len(self))
+
+    def __len__(self):
+        return len(next(iter(self._arrays.values()))) if self._arrays else 0
+
+    def prices(self, column='Close'):
+        """某一价格列，默认收盘价。"""
+        return self._arrays[column]
+
+    def features(self):
+        """除Date和Index外所有列组成的float32特征矩阵，首次访问时计算并缓存。"""
+        if self._features is None:
+            names = [name for name in self._arrays if name not in ('Date', 'Index')]
+            features = np.column_stack([np.asarray(self._arrays[name], dtype=np.float32) for name in names])
+            features.flags.writeable = False
+            self._features = features
+        return self._features
+
+    def as_dataset(self):
+        """包装为 ColumnarDataset，可以直接 drop 后传给 DQNEnv / PPOEnv。"""
+        return ColumnarDataset(dict(self._arrays), 'Date')
+
+    @property
+    def nbytes(self):
+        """数据集在内存中占用的字节数（内存映射的列不计入）。"""
+        total = 0 if self._features is None else self._features.nbytes
+        for array in self._arrays.values():
+            if not isinstance(array.base, np.memmap):
+                total += array.nbytes
+        return total
+
+
+class DatasetRegistry:
+    """
+    数据集注册表：以 文件路径 + 修改时间 + 文件大小 为键缓存解析结果，每个文件只解析一次，
+    超过容量时按最近最少使用（LRU）淘汰。文件被修改后会自动重新解析。
+    """
+
+    def __init__(self, max_entries=8):
+        """
+        参数:
+            max_entries (int): 最多缓存的数据集数量。
+        """
+        self.max_entries = max_entries
+        self.file_io = FileIOClass()
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, file_path):
+        """
+        获取数据集的只读视图，支持CSV文件和 FileIOClass.write_columnar 写出的列式数据文件。
+
+        参数:
+            file_path (str): 数据文件路径。
+
+        返回:
+            view (DatasetView): 数据集视图。
+        """
+        path = os.path.abspath(file_path)
+        stat = os.stat(path)
+        signature = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry[0] == signature:
+                self._entries.move_to_end(path)
+                return entry[1]
+
+        view = DatasetView(file_path, self._load(path))
+        with self._lock:
+            self._entries[path] = (signature, view)
+            self._entries.move_to_end(path)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return view
+
+    def _load(self, path):
+        if path.endswith(".stk"):
+            dataset = self.file_io.open_columnar(path)
+            return {name: dataset[name] for name in dataset.columns}
+        data = pd.read_csv(path)
+        arrays = {name: data[name].to_numpy() for name in data.columns}
+        if 'Date' in arrays:
+            arrays['Date'] = arrays['Date'].astype('datetime64[D]')
+        return arrays
+
+    def invalidate(self, file_path=None):
+        """移除某个文件的缓存，不指定文件时清空全部缓存。"""
+        with self._lock:
+            if file_path is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(os.path.abspath(file_path), None)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+_default_registry = DatasetRegistry()
+
+
+def get_default_registry():
+    """进程内共享的默认注册表，main.py、StockLogger 等通过它共用解析结果。"""
+    return _default_registry
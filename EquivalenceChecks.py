@@ -0,0 +1,494 @@
+import argparse
+import multiprocessing
+import sys
+from multiprocessing import shared_memory
+import numpy as np
+from stable_baselines3 import DQN
+from DataGenerationAndManagementClass import DataGenerationAndManagementClass
+from DQNEnv import DQNEnv
+from ObservationBuilder import ObservationBuilder
+from OrderExecution import OrderExecutionEngine
+from PPOEnv import PPOEnv
+from Profiler import Profiler, ProfilingCallback
+from SharedDataset import SharedDataset, SharedEnvFactory
+from VecTradingEnv import VecTradingEnv
+
+
+# 原实现的参考版本：与重构前的代码逐行对应，只用于比较，不要“顺手优化”
+
+def reference_dqn_order(action, balance, portfolio, price, fee_rate, max_stocks):
+    """DQNEnv._take_action 原来的成交逻辑：先按价格算可买数量，再逐股递减直到计入手续费的成本不超过余额。"""
+    max_buyable_stocks = min(balance // price, max_stocks - portfolio)
+    if action == 0 and max_buyable_stocks > 0:
+        buy_quantity = int(max_buyable_stocks)
+        cost = buy_quantity * price * (1 + fee_rate)
+        while cost > balance:
+            buy_quantity -= 1
+            cost = buy_quantity * price * (1 + fee_rate)
+        portfolio += buy_quantity
+        balance -= cost
+    elif action == 1 and portfolio > 0:
+        sell_quantity = int(portfolio)
+        proceeds = sell_quantity * price * (1 - fee_rate)
+        portfolio -= sell_quantity
+        balance += proceeds
+    return balance, portfolio
+
+
+def reference_ppo_buy(balance, price, holdings, fee_rate, invest_ratio, max_stocks):
+    """PPOEnv.step 原来的买入数量：只按价格计算，计入手续费后超过余额时整笔放弃。"""
+    bought_shares = min((balance * invest_ratio) // price, max_stocks - holdings)
+    total_cost = bought_shares * price
+    if bought_shares > 0 and balance >= total_cost + total_cost * fee_rate:
+        return bought_shares
+    return 0
+
+
+class ReferenceDQNEnv:
+    """原来的 DQNEnv：每步用 iloc 逐行读取行情，观测为float64。"""
+
+    def __init__(self, data, initial_balance=10000, fee_rate=0, rebalance_period=1, max_stocks=float('inf')):
+        self.data = data
+        self.initial_balance = initial_balance
+        self.fee_rate = fee_rate
+        self.rebalance_period = rebalance_period
+        self.max_stocks = max_stocks
+
+    def reset(self):
+        self.balance = self.initial_balance
+        self.current_step = 0
+        self.portfolio = 0
+        self.total_value = self.initial_balance
+        return self._next_observation()
+
+    def _next_observation(self):
+        obs = list(self.data.iloc[self.current_step])
+        obs.append(self.balance)
+        obs.append(self.portfolio)
+        return np.array(obs)
+
+    def _take_action(self, action):
+        last_balance, last_portfolio = self.balance, self.portfolio
+        current_price = self.data.iloc[self.current_step]["Close"]
+        self.balance, self.portfolio = reference_dqn_order(action, self.balance, self.portfolio, current_price,
+                                                           self.fee_rate, self.max_stocks)
+        total_value = self.balance + self.portfolio * current_price
+        reward = total_value - self.total_value
+        self.total_value = total_value
+        if last_balance == self.balance or last_portfolio == self.portfolio:
+            reward -= self.initial_balance / 100
+        return reward
+
+    def step(self, action):
+        if self.current_step + self.rebalance_period > len(self.data) - 1:
+            reward = self._take_action(action)
+            return self._next_observation(), reward, True, {"total_asset": self.total_value,
+                                                            "day": len(self.data) - 1, "portfolio": self.portfolio}
+        day = self.current_step
+        reward = self._take_action(action)
+        self.current_step += self.rebalance_period
+        return self._next_observation(), reward, False, {"total_asset": self.total_value, "day": day,
+                                                         "portfolio": self.portfolio}
+
+
+class ReferencePPOEnv:
+    """原来的 PPOEnv：每步用 iloc 逐行读取行情，每次只前进一天（不支持 rebalance_period）。"""
+
+    def __init__(self, df, initial_balance=10000, invest_ratio=0.1, max_stocks=100, fee_rate=0.001):
+        self.df = df
+        self.initial_balance = initial_balance
+        self.investment_ratio = invest_ratio
+        self.max_shares = max_stocks
+        self.transaction_fee_ratio = fee_rate
+
+    def reset(self):
+        self.current_step = 0
+        self.balance = self.initial_balance
+        self.shares_held = 0
+        self.total_asset = self.balance
+        return self._next_observation()
+
+    def _next_observation(self):
+        row = self.df.iloc[self.current_step]
+        return np.array([row['Open'], row['High'], row['Low'], row['Close'], row['Volume'], self.balance])
+
+    def step(self, action):
+        current_price = self.df.iloc[self.current_step]['Close']
+        bought_shares = 0
+        traded = False
+        transaction_fee = 0
+        if action == 0:
+            bought_shares = min((self.balance * self.investment_ratio) // current_price,
+                                self.max_shares - self.shares_held)
+            total_cost = bought_shares * current_price
+            transaction_fee = total_cost * self.transaction_fee_ratio
+            if bought_shares > 0 and self.balance >= (total_cost + transaction_fee):
+                self.balance -= (total_cost + transaction_fee)
+                self.shares_held += bought_shares
+                traded = True
+        elif action == 1 and self.shares_held > 0:
+            total_sale = self.shares_held * current_price
+            transaction_fee = total_sale * self.transaction_fee_ratio
+            self.balance += (total_sale - transaction_fee)
+            self.shares_held = 0
+            traded = True
+        self.total_asset = self.balance + self.shares_held * current_price
+        self.current_step += 1
+        done = self.current_step >= len(self.df) - 1
+        reward = self.total_asset - self.initial_balance
+        if traded:
+            reward += 500
+        return self._next_observation(), reward, done, {'total_asset': self.total_asset,
+                                                        'bought_shares': bought_shares,
+                                                        'transaction_fee': transaction_fee}
+
+
+def _market_data(seed, start="2020-01-01", end="2020-12-31"):
+    """检查用的行情数据，去掉日期和序号列（与 main.py 传给环境的数据相同）。"""
+    data = DataGenerationAndManagementClass().generate_stock_data_vectorized("CHECK", start, end, seed=seed)
+    return data.drop(columns=['Date', 'Index'])
+
+
+def _rollout(env, actions):
+    """用给定的动作序列跑完一个回合，返回 (观测列表, 奖励列表, info列表)，观测和info都复制保存。"""
+    observations = [np.array(env.reset(), copy=True)]
+    rewards, infos = [], []
+    done = False
+    while not done:
+        obs, reward, done, info = env.step(actions[len(rewards)])
+        observations.append(np.array(obs, copy=True))
+        rewards.append(reward)
+        infos.append(dict(info))
+    return observations, rewards, infos
+
+
+def _order_cases(n_cases, seed):
+    """随机订单，其中一部分的余额恰好是价格（或计入手续费的价格）的整数倍，覆盖整除和舍入的边界。"""
+    rng = np.random.default_rng(seed)
+    # 价格保留0到4位小数
+    scale = 10.0 ** rng.integers(0, 5, n_cases)
+    price = np.maximum(np.round(rng.uniform(0.01, 500, n_cases) * scale) / scale, 0.01)
+    fee_rate = rng.choice([0, 0.0001, 0.001, 0.003, 0.01, 0.1], n_cases)
+    shares = rng.integers(0, 2000, n_cases)
+    balance = np.round(rng.uniform(0, 1e6, n_cases), 2)
+    edge = rng.integers(0, 3, n_cases)
+    balance = np.where(edge == 1, shares * price, balance)
+    balance = np.where(edge == 2, shares * price * (1 + fee_rate), balance)
+    holdings = rng.integers(0, 50, n_cases).astype(np.float64)
+    max_stocks = np.where(rng.random(n_cases) < 0.5, np.inf, rng.integers(0, 2000, n_cases))
+    invest_ratio = rng.choice([0.1, 0.25, 0.5, 1.0], n_cases)
+    return price, fee_rate, balance, holdings, max_stocks, invest_ratio
+
+
+def check_order_sizing(n_cases=100000, seed=0):
+    """
+    OrderExecutionEngine 的闭式买入数量与原来的逐股递减循环比较。
+
+    - DQN（invest_ratio=1）：标量和数组两种计算的成交后余额、持仓都必须与原循环完全相同。
+    - PPO 且 fee_rate=0：买入数量必须与原实现相同。
+    - PPO 且 fee_rate>0：这是有意的行为变化。原实现只按价格算数量，计入手续费后可能超出 余额×invest_ratio，
+      余额不足时整笔放弃；现在买入计入手续费后预算内的最大数量。检查结果只在原实现超出预算或放弃交易时不同。
+
+    返回:
+        failures (list): 不一致的描述，为空表示全部通过。
+    """
+    price, fee_rate, balance, holdings, max_stocks, invest_ratio = _order_cases(n_cases, seed)
+    failures = []
+
+    for fee in np.unique(fee_rate):
+        rows = np.flatnonzero(fee_rate == fee)
+        # 同一手续费率的订单用数组版本一次成交，持仓上限逐个订单不同
+        engine = OrderExecutionEngine(fee_rate=fee, invest_ratio=1.0, max_stocks=max_stocks[rows])
+        actions = np.zeros(len(rows), dtype=np.int64)
+        new_balance, new_holdings, _, _ = engine.execute(actions, balance[rows], holdings[rows], price[rows])
+        for j, i in enumerate(rows):
+            expected = reference_dqn_order(0, balance[i], holdings[i], price[i], fee, max_stocks[i])
+            scalar = OrderExecutionEngine(fee, 1.0, max_stocks[i]).buy_quantity(balance[i], price[i], holdings[i])
+            if (new_balance[j], new_holdings[j]) != expected or holdings[i] + scalar != expected[1]:
+                failures.append(f"DQN 买入不一致：余额 {balance[i]!r}，价格 {price[i]!r}，手续费率 {fee}，"
+                                f"持仓 {holdings[i]!r}，上限 {max_stocks[i]!r}")
+
+    for i in range(n_cases):
+        engine = OrderExecutionEngine(fee_rate[i], invest_ratio[i], max_stocks[i])
+        quantity = engine.buy_quantity(balance[i], price[i], holdings[i])
+        old = reference_ppo_buy(balance[i], price[i], holdings[i], fee_rate[i], invest_ratio[i], max_stocks[i])
+        budget = balance[i] * invest_ratio[i]
+        if engine.buy_cost(quantity, price[i]) > budget or quantity > max(max_stocks[i] - holdings[i], 0):
+            failures.append(f"PPO 买入超出预算或持仓上限：余额 {balance[i]!r}，价格 {price[i]!r}")
+        elif quantity != old and (fee_rate[i] == 0 or engine.buy_cost(old, price[i]) <= budget and old > 0):
+            failures.append(f"PPO 买入数量 {quantity} 与原实现 {old} 不一致：余额 {balance[i]!r}，"
+                            f"价格 {price[i]!r}，手续费率 {fee_rate[i]}")
+    return failures
+
+
+def check_env_fast_path(seeds=(0, 1, 2)):
+    """
+    数组实现的 DQNEnv / PPOEnv 与原来逐行读取的实现比较：余额、奖励、结束标志和 info 必须完全相同，
+    float32 观测必须等于原来float64观测转换为float32的结果。
+
+    DQNEnv 检查多种手续费率和调仓周期；PPOEnv 检查 fee_rate=0、rebalance_period=1，
+    因为原实现不支持调仓周期，手续费率大于0时的买入数量是有意的变化（见 check_order_sizing）。
+
+    返回:
+        failures (list): 不一致的描述，为空表示全部通过。
+    """
+    failures = []
+    for seed in seeds:
+        data = _market_data(seed)
+        actions = np.random.default_rng(seed).integers(0, 3, len(data))
+        cases = [(f"DQNEnv fee_rate={fee} rebalance_period={period}",
+                  DQNEnv(data, fee_rate=fee, rebalance_period=period, max_stocks=limit),
+                  ReferenceDQNEnv(data, fee_rate=fee, rebalance_period=period, max_stocks=limit))
+                 for fee, period, limit in ((0, 1, float('inf')), (0.001, 1, float('inf')), (0.003, 5, 40))]
+        cases.append(("PPOEnv fee_rate=0", PPOEnv(data, fee_rate=0), ReferencePPOEnv(data, fee_rate=0)))
+        for name, env, reference in cases:
+            observations, rewards, infos = _rollout(env, actions)
+            expected = _rollout(reference, actions)
+            if len(rewards) != len(expected[1]):
+                failures.append(f"{name}（种子 {seed}）：回合长度 {len(rewards)} 与原实现 {len(expected[1])} 不同")
+                continue
+            for step, (obs, reference_obs) in enumerate(zip(observations, expected[0])):
+                if obs.dtype != np.float32 or not np.array_equal(obs, reference_obs.astype(np.float32)):
+                    failures.append(f"{name}（种子 {seed}）：第 {step} 个观测不同")
+                    break
+            if rewards != expected[1]:
+                failures.append(f"{name}（种子 {seed}）：奖励不同")
+            for step, (info, reference_info) in enumerate(zip(infos, expected[2])):
+                if any(info[key] != value for key, value in reference_info.items()):
+                    failures.append(f"{name}（种子 {seed}）：第 {step} 步的 info 不同：{info} != {reference_info}")
+                    break
+    return failures
+
+
+def check_frame_skip(seeds=(0, 1), periods=(3, 7, 400), tolerance=1e-9):
+    """
+    rebalance_period 大于1时跳过交易日的环境，与 rebalance_period=1、调仓日之间全部持有的逐日环境比较。
+
+    - 每个调仓日的 day、持仓和观测（含滚动技术指标）必须完全相同；
+    - equity_curve 展开的逐日 days、持仓必须与逐日环境相同，总资产的相对误差不超过 tolerance；
+    - PPOEnv 每次调仓的奖励等于逐日环境在持有期内的奖励之和，相对误差不超过 tolerance
+      （前缀和与逐日累加的舍入不同；DQNEnv 的不交易惩罚按步计算，奖励不可比）；
+    - VecTradingEnv 的PPO语义与逐个 PPOEnv 的总资产、结束标志和观测相同，float32奖励只允许舍入误差
+      （批量环境用收盘价前缀和，PPOEnv 对收盘价切片求和）。
+    periods 中大于数据长度的值检查只有一次调仓的回合。
+
+    返回:
+        failures (list): 不一致的描述，为空表示全部通过。
+    """
+    failures = []
+    kwargs = dict(fee_rate=0.001, invest_ratio=0.5, max_stocks=100)
+    for seed in seeds:
+        data = _market_data(seed)
+        decisions = np.random.default_rng(seed).integers(0, 3, len(data))
+        for env_class in (DQNEnv, PPOEnv):
+            for period in periods:
+                name = f"{env_class.__name__} rebalance_period={period}（种子 {seed}）"
+                env = env_class(data, rebalance_period=period, observation_builder=ObservationBuilder(), **kwargs)
+                observations, rewards, infos = _rollout(env, decisions)
+                # 逐日环境只在调仓日执行同样的动作，其余交易日持有
+                daily_actions = np.full(len(data), 2)
+                daily_actions[:len(rewards) * period:period] = decisions[:len(rewards)]
+                daily = env_class(data, rebalance_period=1, observation_builder=ObservationBuilder(), **kwargs)
+                daily_observations, daily_rewards, daily_infos = _rollout(daily, daily_actions)
+
+                for j, info in enumerate(infos):
+                    reference_info = daily_infos[min(j * period, len(daily_infos) - 1)]
+                    if (info["day"], info["portfolio"]) != (reference_info["day"], reference_info["portfolio"]) and \
+                            not (j == len(infos) - 1 and env_class is DQNEnv):
+                        failures.append(f"{name}：第 {j} 次调仓的 day 或持仓不同")
+                        break
+                for j, obs in enumerate(observations[:-1]):
+                    if not np.array_equal(obs, daily_observations[j * period]):
+                        failures.append(f"{name}：第 {j} 次调仓的观测不同")
+                        break
+
+                curve = env.equity_curve([info["total_asset"] for info in infos],
+                                         [info["portfolio"] for info in infos])
+                n_days = len(curve["days"])
+                daily_asset = np.array([info["total_asset"] for info in daily_infos])
+                daily_portfolios = np.array([info["portfolio"] for info in daily_infos])
+                if not np.array_equal(curve["days"], np.arange(n_days)) or n_days > len(daily_infos):
+                    failures.append(f"{name}：equity_curve 的 days 不连续")
+                elif not np.array_equal(curve["portfolios"], daily_portfolios[:n_days]):
+                    failures.append(f"{name}：equity_curve 的持仓不同")
+                elif not np.allclose(curve["total_asset"], daily_asset[:n_days], rtol=tolerance, atol=tolerance):
+                    failures.append(f"{name}：equity_curve 的总资产相对误差超过 {tolerance}")
+
+                if env_class is PPOEnv:
+                    held = [sum(daily_rewards[j * period:(j + 1) * period]) for j in range(len(rewards))]
+                    if not np.allclose(rewards, held, rtol=tolerance, atol=tolerance):
+                        failures.append(f"{name}：奖励与持有期内逐日奖励之和的相对误差超过 {tolerance}")
+
+    frames = [_market_data(seed) for seed in seeds]
+    rng = np.random.default_rng(len(seeds))
+    for period in (1,) + tuple(periods):
+        name = f"VecTradingEnv PPO rebalance_period={period}"
+        vec_env = VecTradingEnv(frames, num_envs=len(frames), env_type="PPO", rebalance_period=period, **kwargs)
+        envs = [PPOEnv(frame, rebalance_period=period, **kwargs) for frame in frames]
+        vec_env.reset()
+        for env in envs:
+            env.reset()
+        # 跑两倍数据长度的步数，覆盖结束后自动重置的回合
+        for step in range(2 * len(frames[0])):
+            actions = rng.integers(0, 3, len(envs))
+            vec_obs, vec_rewards, vec_dones, vec_infos = vec_env.step(actions)
+            mismatched = []
+            for i, env in enumerate(envs):
+                obs, reward, done, info = env.step(actions[i])
+                if done:
+                    obs = env.reset()
+                if (not np.isclose(reward, vec_rewards[i], rtol=1e-6)
+                        or info["total_asset"] != vec_infos[i]["total_asset"]
+                        or done != vec_dones[i] or not np.array_equal(obs, vec_obs[i])):
+                    mismatched.append(i)
+            if mismatched:
+                failures.append(f"{name}：第 {step} 步回合 {mismatched} 与 PPOEnv 不同")
+                break
+    return failures
+
+
+def check_indicators(n_days=20000, seed=0, tolerance=1e-9):
+    """
+    ObservationBuilder 逐根K线 update 的增量结果与 compute 的向量化结果比较。
+
+    环形缓冲区和滚动求和（尤其是 RSI 和波动率）在修改后容易悄悄出错或累积误差，因此用较长的生成序列检查，
+    另外把同一序列平移到包含0和负数的价格，覆盖收益率和RSI的边界处理。每根K线的全部指标的误差都不能超过 tolerance
+    （相对误差和绝对误差）。波动率比较的是方差：窗口内收益率全为0时，滚动和相减留下的约1e-15的残差开平方后
+    会放大到1e-7量级，这不是逻辑错误。
+
+    返回:
+        failures (list): 不一致的描述，为空表示全部通过。
+    """
+    start = np.datetime64("2000-01-01")
+    close = DataGenerationAndManagementClass().generate_stock_data_vectorized(
+        "CHECK", str(start), str(start + n_days - 1), seed=seed)["Close"].to_numpy()
+    series = {"生成的收盘价": close, "含0和负数的收盘价": close - np.median(close)}
+    configs = ({}, {"sma_windows": (1, 3, 50), "rsi_window": 2, "volatility_window": 2, "lags": (1, 2, 30)},
+               {"sma_windows": (), "rsi_window": None, "volatility_window": None, "lags": (7,)})
+    failures = []
+    for series_name, prices in series.items():
+        for config in configs:
+            builder = ObservationBuilder(**config)
+            expected = builder.compute(prices)
+            incremental = np.array([list(builder.update(price)) for price in prices]).reshape(expected.shape)
+            volatility = [name.startswith("Volatility_") for name in builder.feature_names]
+            incremental[:, volatility] **= 2
+            expected[:, volatility] **= 2
+            if not np.allclose(incremental, expected, rtol=tolerance, atol=tolerance):
+                row, column = np.unravel_index(np.argmax(np.abs(incremental - expected)), expected.shape)
+                failures.append(f"{series_name} {config}：第 {row} 根K线的 {builder.feature_names[column]} "
+                                f"为 {incremental[row, column]!r}，compute 为 {expected[row, column]!r}")
+    return failures
+
+
+def _shared_env_rollout(factory, actions):
+    """在子进程中用 SharedEnvFactory 创建环境并跑完一个回合（模块级函数，spawn 启动的子进程可以导入）。"""
+    env = factory()
+    observations, rewards, infos = _rollout(env, actions)
+    # 环境的特征矩阵应当直接引用子进程连接到的共享内存，而不是反序列化时复制的数据
+    attached = not factory.shared.owner and np.shares_memory(env._features, factory.shared.features)
+    return (np.array(observations), rewards, [info["total_asset"] for info in infos],
+            env._features.flags.writeable, attached)
+
+
+def check_shared_dataset(seed=0, start_methods=("spawn", "forkserver")):
+    """
+    SharedDataset / SharedEnvFactory 在子进程中的行为：工厂对象被pickle后只传递共享内存的布局，
+    子进程连接同一块共享内存得到只读视图，创建的 DQNEnv / PPOEnv 与直接用 DataFrame 创建的环境结果完全相同；
+    unlink 之后共享内存不能再被连接。
+
+    macOS 和 Windows 上 SubprocVecEnv 默认使用 spawn / forkserver，子进程不继承父进程的内存，
+    因此检查这两种启动方式（当前平台不支持的会被跳过）。运行时需要在 __main__ 保护下调用。
+
+    返回:
+        failures (list): 不一致的描述，为空表示全部通过。
+    """
+    data = DataGenerationAndManagementClass().generate_stock_data_vectorized("CHECK", "2020-01-01", "2020-12-31",
+                                                                            seed=seed)
+    plain_data = data.drop(columns=['Date', 'Index'])
+    actions = np.random.default_rng(seed).integers(0, 3, len(data))
+    kwargs = dict(fee_rate=0.001, rebalance_period=3)
+    failures = []
+    shared = SharedDataset.publish(data)
+    name = shared.layout["name"]
+    try:
+        for env_class in (DQNEnv, PPOEnv):
+            observations, rewards, infos = _rollout(env_class(plain_data, **kwargs), actions)
+            expected_assets = [info["total_asset"] for info in infos]
+            factory = SharedEnvFactory(shared, env_class, **kwargs)
+            for method in start_methods:
+                if method not in multiprocessing.get_all_start_methods():
+                    continue
+                label = f"{env_class.__name__}（{method}）"
+                with multiprocessing.get_context(method).Pool(1) as pool:
+                    child_obs, child_rewards, child_assets, writeable, attached = pool.apply(
+                        _shared_env_rollout, (factory, actions))
+                if writeable:
+                    failures.append(f"{label}：子进程中的特征矩阵不是只读视图")
+                if not attached:
+                    failures.append(f"{label}：子进程中的特征矩阵没有引用共享内存")
+                if not np.array_equal(child_obs, np.array(observations)):
+                    failures.append(f"{label}：观测与直接创建的环境不同")
+                if child_rewards != rewards or child_assets != expected_assets:
+                    failures.append(f"{label}：奖励或总资产与直接创建的环境不同")
+    finally:
+        shared.unlink()
+
+    try:
+        leaked = shared_memory.SharedMemory(name=name)
+    except FileNotFoundError:
+        pass
+    else:
+        leaked.close()
+        failures.append(f"unlink 之后共享内存 {name} 仍然存在")
+    return failures
+
+
+def check_profiler_split(total_timesteps=2000, seed=0):
+    """
+    ProfilingCallback 的耗时划分：VecTradingEnv 的 step 和 step_wait 都被插桩时，
+    env_time 只能计入最外层的 step（step_wait 在其内部），并且不能超过采样时间。
+
+    返回:
+        failures (list): 不一致的描述，为空表示全部通过。
+    """
+    profiler = Profiler()
+    env = profiler.instrument(VecTradingEnv(_market_data(seed), num_envs=4))
+    callback = ProfilingCallback(profiler)
+    DQN("MlpPolicy", env, learning_starts=100, seed=seed, verbose=0).learn(total_timesteps, callback=callback)
+    summary = callback.summary(0.0)
+    failures = []
+    step_time = profiler.stats("VecTradingEnv.step")["total"]
+    if profiler.stats("VecTradingEnv.step_wait")["count"] == 0:
+        failures.append("step_wait 没有被计时，检查没有覆盖重复计算的情况")
+    if summary["env_time"] != step_time:
+        failures.append(f"env_time {summary['env_time']:.4f} 不等于最外层 step 的耗时 {step_time:.4f}")
+    if summary["env_time"] > summary["rollout_time"]:
+        failures.append(f"env_time {summary['env_time']:.4f} 超过采样时间 {summary['rollout_time']:.4f}")
+    return failures
+
+
+CHECKS = {
+    "order_sizing": check_order_sizing,
+    "env_fast_path": check_env_fast_path,
+    "frame_skip": check_frame_skip,
+    "indicators": check_indicators,
+    "shared_dataset": check_shared_dataset,
+    "profiler_split": check_profiler_split,
+}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="重构后的实现与原实现的等价性检查")
+    parser.add_argument("--checks", nargs="+", default=list(CHECKS), choices=list(CHECKS))
+    args = parser.parse_args()
+
+    failed = False
+    for name in args.checks:
+        failures = CHECKS[name]()
+        for failure in failures[:20]:
+            print(f"{name}: {failure}")
+        print(f"{name}: {'通过' if not failures else f'{len(failures)} 处不一致'}")
+        failed = failed or bool(failures)
+    if failed:
+        sys.exit(1)
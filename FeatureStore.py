@@ -0,0 +1,162 @@
+import hashlib
+import json
+import os
+import numpy as np
+from ObservationBuilder import ObservationBuilder
+
+# 默认特征：以第一天收盘价归一化的OHLC、对数成交量、对数收益率，再加上 ObservationBuilder 的默认指标
+DEFAULT_SPEC = {
+    "price_columns": ["Open", "High", "Low", "Close"],
+    "volume": True,
+    "returns": [1],
+    "indicators": {},
+}
+
+
+class FeatureStore:
+    """
+    磁盘上的特征矩阵缓存：对一份数据一次性向量化计算完整的特征矩阵，保存为 .npy 文件，
+    文件名由源数据和特征配置的哈希决定。之后任意多个环境和进程都以只读内存映射方式共享同一个文件，
+    通过 DQNEnv / PPOEnv 的 feature_matrix 参数直接从中切出观测。
+    """
+
+    def __init__(self, store_dir="feature_store"):
+        """
+        参数:
+            store_dir (str): 特征文件的保存目录。
+        """
+        self.store_dir = store_dir
+
+    def normalize_spec(self, spec=None):
+        """补全特征配置中的默认值。"""
+        return dict(DEFAULT_SPEC, **(spec or {}))
+
+    def key(self, data, spec=None):
+        """
+        由特征配置和用到的源数据列计算哈希，数据或配置任何一处改变都会得到不同的键。
+
+        参数:
+            data (pd.DataFrame or ColumnarDataset): 行情数据，至少包含配置中用到的列和Close列。
+            spec (dict): 特征配置，格式见 DEFAULT_SPEC。
+
+        返回:
+            key (str): 十六进制哈希字符串。
+        """
+        spec = self.normalize_spec(spec)
+        digest = hashlib.sha256(json.dumps(spec, sort_keys=True).encode())
+        for name in self._source_columns(spec):
+            column = np.ascontiguousarray(data[name], dtype=np.float64)
+            digest.update(name.encode())
+            digest.update(column.view(np.uint8))
+        return digest.hexdigest()[:32]
+
+    def _source_columns(self, spec):
+        names = list(spec["price_columns"])
+        if spec["volume"]:
+            names.append("Volume")
+        if "Close" not in names:
+            names.append("Close")
+        return names
+
+    def feature_names(self, spec=None):
+        """特征矩阵各列的名称。"""
+        spec = self.normalize_spec(spec)
+        names = [f"{name}_norm" for name in spec["price_columns"]]
+        if spec["volume"]:
+            names.append("Volume_log")
+        names += [f"LogReturn_{k}" for k in spec["returns"]]
+        if spec["indicators"] is not None:
+            names += ObservationBuilder(**spec["indicators"]).feature_names
+        return names
+
+    def bounds(self, spec=None):
+        """
+        特征矩阵各列的取值范围，作为环境的 feature_bounds 传入。
+
+        返回:
+            (low, high): 两个float32数组；归一化价格和收益率可以为负，对数成交量不小于0，指标使用 ObservationBuilder 的范围。
+        """
+        spec = self.normalize_spec(spec)
+        low = [-np.inf] * len(spec["price_columns"])
+        high = [np.inf] * len(spec["price_columns"])
+        if spec["volume"]:
+            low.append(0.0)
+            high.append(np.inf)
+        low += [-np.inf] * len(spec["returns"])
+        high += [np.inf] * len(spec["returns"])
+        if spec["indicators"] is not None:
+            builder = ObservationBuilder(**spec["indicators"])
+            low += builder.low.tolist()
+            high += builder.high.tolist()
+        return np.array(low, dtype=np.float32), np.array(high, dtype=np.float32)
+
+    def compute(self, data, spec=None):
+        """
+        向量化计算完整的特征矩阵，第t行只用到第t天及以前的数据。
+
+        返回:
+            features (np.ndarray): 形状为 (len(data), 特征数) 的float32矩阵。
+        """
+        spec = self.normalize_spec(spec)
+        close = np.ascontiguousarray(data["Close"], dtype=np.float64)
+        scale = close[0] if len(close) and close[0] != 0 else 1.0
+        columns = [np.asarray(data[name], dtype=np.float64) / scale for name in spec["price_columns"]]
+        if spec["volume"]:
+            columns.append(np.log1p(np.maximum(np.asarray(data["Volume"], dtype=np.float64), 0)))
+        for k in spec["returns"]:
+            base = np.concatenate((np.full(min(k, len(close)), np.nan), close[:-k] if k < len(close) else []))
+            valid = (base > 0) & (close > 0)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                columns.append(np.where(valid, np.log(np.where(valid, close / base, 1.0)), 0.0))
+        if spec["indicators"] is not None:
+            indicators = ObservationBuilder(**spec["indicators"]).compute(close)
+            columns.extend(indicators.T)
+        features = np.empty((len(close), len(columns)), dtype=np.float32)
+        for i, column in enumerate(columns):
+            features[:, i] = column
+        return features
+
+    def path(self, key):
+        return os.path.join(self.store_dir, f"{key}.npy")
+
+    def get(self, data, spec=None):
+        """
+        获取数据对应的特征矩阵：已存在时直接以只读内存映射打开，否则计算并保存后再打开。
+
+        参数:
+            data (pd.DataFrame or ColumnarDataset): 行情数据。
+            spec (dict): 特征配置，格式见 DEFAULT_SPEC。
+
+        返回:
+            features (np.memmap): 只读的float32特征矩阵，可以直接传给环境的 feature_matrix 参数。
+        """
+        file_path = self.path(self.key(data, spec))
+        if not os.path.exists(file_path):
+            os.makedirs(self.store_dir, exist_ok=True)
+            # 先写临时文件再原子替换，多个进程同时计算同一份特征时不会读到写了一半的文件
+            temp_path = f"{file_path}.{os.getpid()}.tmp"
+            with open(temp_path, "wb") as file:
+                np.save(file, self.compute(data, spec))
+            os.replace(temp_path, file_path)
+        return np.load(file_path, mmap_mode='r')
+
+
+if __name__ == "__main__":
+    import argparse
+    from FileIOClass import FileIOClass
+
+    parser = argparse.ArgumentParser(description="为列式数据文件预先计算特征矩阵")
+    parser.add_argument("data_files", nargs="+", help="FileIOClass.write_columnar 写出的数据文件")
+    parser.add_argument("--store-dir", default="feature_store")
+    parser.add_argument("--spec", default=None, help="特征配置JSON文件，默认使用 DEFAULT_SPEC")
+    args = parser.parse_args()
+
+    spec = None
+    if args.spec:
+        with open(args.spec) as file:
+            spec = json.load(file)
+    store = FeatureStore(args.store_dir)
+    file_io = FileIOClass()
+    for data_file in args.data_files:
+        features = store.get(file_io.open_columnar(data_file), spec)
+        print(f"{data_file}: {features.shape} -> {features.filename}")
@@ -1,3 +1,71 @@
+import json
+import numpy as np
+import pandas as pd
+
+# 二进制列式数据文件的格式标识和列数据的对齐字节数
+COLUMNAR_MAGIC = b"STKCOL1\0"
+COLUMNAR_ALIGNMENT = 64
+
+# 流式读取时各列的类型，未列出的列按浮点数解析
+COLUMN_TYPES = {'Date': 'datetime64[D]', 'Symbol': str, 'Index': np.int64, 'Volume': np.int64}
+
+
+class ColumnarDataset:
+    """
+    内存映射的列式数据集，由 FileIOClass.open_columnar 返回。
+
+    每一列都是直接指向映射文件的只读numpy数组，取列不会复制数据。接口与环境使用到的DataFrame部分保持一致
+    （columns、按列名取值、drop、to_numpy），因此可以直接传给 DQNEnv / PPOEnv。
+    """
+
+    def __init__(self, arrays, index_name=None):
+        """
+        参数:
+            arrays (dict): 列名到numpy数组的有序映射。
+            index_name (str): 作为日期索引的列名。
+        """
+        self._arrays = arrays
+        self.index_name = index_name
+
+    @property
+    def columns(self):
+        return list(self._arrays)
+
+    @property
+    def index(self):
+        """日期索引（datetime64[D]数组），没有日期列时返回行号。"""
+        if self.index_name in self._arrays:
+            return self._arrays[self.index_name]
+        return np.arange(len(self))
+
+    def __len__(self):
+        return len(next(iter(self._arrays.values()))) if self._arrays else 0
+
+    def __contains__(self, name):
+        return name in self._arrays
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return self._arrays[key]
+        return ColumnarDataset({name: self._arrays[name] for name in key}, self.index_name)
+
+    def drop(self, columns):
+        columns = [columns] if isinstance(columns, str) else list(columns)
+        return ColumnarDataset({name: array for name, array in self._arrays.items() if name not in columns},
+                               self.index_name)
+
+    def slice(self, start=None, stop=None):
+        """按行切片，每一列都是原数组的视图，不复制数据。"""
+        return ColumnarDataset({name: array[start:stop] for name, array in self._arrays.items()}, self.index_name)
+
+    def to_numpy(self, dtype=None):
+        """把所有列按顺序拼成 (行数, 列数) 的矩阵（会复制数据）。"""
+        return np.column_stack([np.asarray(array, dtype=dtype) for array in self._arrays.values()])
+
+    def to_dataframe(self):
+        return pd.DataFrame({name: np.asarray(array) for name, array in self._arrays.items()})
+
+
 class FileIOClass:
     def __init__(self):
         """
@@ -5,16 +73,20 @@ class FileIOClass:
         """
         self.file_path = ""  # 初始化为空字符串，后续可根据实际情况赋值
 
-    def read_historical_data(self, file_path):
+    def read_historical_data(self, file_path, chunk_size=None, columns=None):
         """
         读取历史数据文件的方法，假设数据文件是CSV格式（可根据实际调整），包含Date, Open, High, Low, Close, Volume等列。
 
         参数:
             file_path (str): 历史数据文件的完整路径。
+            chunk_size (int): 指定时改为流式读取，返回按 chunk_size 行分块的生成器，见 iter_historical_data。
+            columns (list): 流式读取时只解析这些列，默认解析全部列。
 
         返回:
             data (list): 以列表形式返回读取到的数据，每一行数据可以用字典或者列表等形式表示，例如[{'Date': '2021-01-01', 'Open': 100, 'High': 105, 'Low': 98, 'Close': 102, 'Volume': 1000},...]
         """
+        if chunk_size is not None:
+            return self.iter_historical_data(file_path, chunk_size, columns)
         data = []
         try:
             with open(file_path, 'r') as file:
@@ -28,6 +100,38 @@ class FileIOClass:
             print(f"文件 {file_path} 不存在，请检查文件路径！")
             return []
 
+    def iter_historical_data(self, file_path, chunk_size=100000, columns=None):
+        """
+        流式读取CSV历史数据，每次解析 chunk_size 行并转换为带类型的列，内存占用与文件大小无关。
+
+        日期列解析为datetime64[D]，成交量和序号为整数，股票代码为字符串，其余列为浮点数。
+
+        参数:
+            file_path (str): 历史数据文件的完整路径。
+            chunk_size (int): 每块的行数。
+            columns (list): 只解析这些列，默认解析全部列。
+
+        返回:
+            chunks (generator): 依次生成 ColumnarDataset，可以直接传给 DQNEnv / PPOEnv 或转换为DataFrame。
+        """
+        try:
+            with open(file_path, 'r') as file:
+                header = file.readline().strip().split(',')  # 读取表头
+        except FileNotFoundError:
+            print(f"文件 {file_path} 不存在，请检查文件路径！")
+            return
+        selected = header if columns is None else list(columns)
+        missing = [name for name in selected if name not in header]
+        if missing:
+            raise ValueError(f"文件 {file_path} 中没有列 {missing}。")
+
+        # 使用pandas的C解析器分块读取，只解析需要的列；日期和股票代码先按字符串读入，再整列转换类型
+        dtypes = {name: str if name in ('Date', 'Symbol') else COLUMN_TYPES.get(name, np.float64) for name in selected}
+        reader = pd.read_csv(file_path, usecols=selected, dtype=dtypes, chunksize=chunk_size)
+        for chunk in reader:
+            arrays = {name: chunk[name].to_numpy(dtype=COLUMN_TYPES.get(name, np.float64)) for name in selected}
+            yield ColumnarDataset(arrays, 'Date')
+
     def write_results(self, data, output_file_path):
         """
         将结果数据写入到本地文件的方法，例如可以将收益率等数据写入文件。
@@ -49,6 +153,80 @@ class FileIOClass:
             print("写入文件时出现错误，请检查相关权限或文件路径等问题。")
             return False
 
+    def write_columnar(self, data, output_file_path, index_name="Date"):
+        """
+        将股票数据以二进制列式格式写入文件：文件头为JSON描述（列名、类型、偏移量），之后每列是连续存放的定长数组。
+
+        参数:
+            data (list, dict or pd.DataFrame): 要保存的数据，可以是 generate_stock_data 返回的字典列表、按列组织的字典或DataFrame。
+            output_file_path (str): 输出文件的路径。
+            index_name (str): 日期索引列名，该列以datetime64[D]类型存储。
+
+        返回:
+            bool: 表示写入操作是否成功，True为成功，False为失败。
+        """
+        if isinstance(data, list):
+            data = pd.DataFrame(data)
+        arrays = {}
+        for name in data.keys():
+            array = np.asarray(data[name])
+            if name == index_name:
+                array = array.astype('datetime64[D]')
+            elif array.dtype == object:
+                array = array.astype(str)
+            arrays[name] = np.ascontiguousarray(array)
+        n_rows = len(next(iter(arrays.values()))) if arrays else 0
+
+        # 各列相对数据区起点的偏移量，数据区从文件头之后的对齐位置开始
+        columns = []
+        offset = 0
+        for name, array in arrays.items():
+            columns.append({"name": name, "dtype": array.dtype.str, "offset": offset})
+            offset = self._align(offset + array.nbytes)
+        header = json.dumps({"n_rows": n_rows, "index": index_name if index_name in arrays else None,
+                             "columns": columns}).encode("utf-8")
+        data_start = self._align(len(COLUMNAR_MAGIC) + 8 + len(header))
+
+        try:
+            with open(output_file_path, 'wb') as file:
+                file.write(COLUMNAR_MAGIC)
+                file.write(len(header).to_bytes(8, 'little'))
+                file.write(header)
+                for column, array in zip(columns, arrays.values()):
+                    file.write(b"\0" * (data_start + column["offset"] - file.tell()))
+                    file.write(array.view(np.uint8))
+            return True
+        except OSError:
+            print("写入文件时出现错误，请检查相关权限或文件路径等问题。")
+            return False
+
+    def open_columnar(self, file_path):
+        """
+        以内存映射方式打开 write_columnar 写出的文件，各列为零拷贝的只读数组，不需要任何解析。
+
+        参数:
+            file_path (str): 列式数据文件路径。
+
+        返回:
+            dataset (ColumnarDataset): 列式数据集，可以直接传给 DQNEnv / PPOEnv。
+        """
+        with open(file_path, 'rb') as file:
+            if file.read(len(COLUMNAR_MAGIC)) != COLUMNAR_MAGIC:
+                raise ValueError(f"文件 {file_path} 不是列式数据文件。")
+            header_length = int.from_bytes(file.read(8), 'little')
+            header = json.loads(file.read(header_length).decode("utf-8"))
+        data_start = self._align(len(COLUMNAR_MAGIC) + 8 + header_length)
+
+        buffer = np.memmap(file_path, dtype=np.uint8, mode='r')
+        arrays = {}
+        for column in header["columns"]:
+            arrays[column["name"]] = np.ndarray(shape=(header["n_rows"],), dtype=np.dtype(column["dtype"]),
+                                                buffer=buffer, offset=data_start + column["offset"])
+        return ColumnarDataset(arrays, header["index"])
+
+    def _align(self, offset):
+        return (offset + COLUMNAR_ALIGNMENT - 1) // COLUMNAR_ALIGNMENT * COLUMNAR_ALIGNMENT
+
 if __name__=="__main__":
     # 实例化文件读写类
     file_io = FileIOClass()
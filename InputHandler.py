@@ -1,5 +1,10 @@
 import datetime
 
+# 命令行脚本中投资组合参数的默认值
+DEFAULT_PORTFOLIO_PARAMETERS = {"initial_balance": 10000, "fee_rate": 0.001, "invest_ratio": 1.0, "rebalance_period": 1,
+                                "max_stocks": float('inf')}
+
+
 class InputHandler:
     """处理用户输入的类，包括股票代码、日期范围和模型选择。"""
 
@@ -182,6 +187,53 @@ class InputHandler:
             "max_stocks": max_stocks
         }
 
+    def validate_model_choice(self, model_choice):
+        """验证模型名称是否为 DQN 或 PPO。"""
+        if model_choice not in ("DQN", "PPO"):
+            raise ValueError("模型必须是 DQN 或 PPO。")
+        return model_choice
+
+    def validate_data_inputs(self, data):
+        """验证配置中的股票代码和日期范围，返回与 get_inputs 相同格式的字典。"""
+        stock_symbol = self.validate_stock_symbol(data.get("stock_symbol"))
+        start_date = self.validate_date(data.get("start_date", ""))
+        end_date = self.validate_date(data.get("end_date", ""))
+        self.validate_date_range(start_date, end_date)
+        return {
+            "stock_symbol": stock_symbol,
+            "start_date": start_date.strftime("%Y-%m-%d"),
+            "end_date": end_date.strftime("%Y-%m-%d"),
+        }
+
+    def validate_portfolio_parameters(self, parameters):
+        """验证配置中的投资组合参数，返回与 get_portfolio_parameters 相同格式的字典。"""
+        max_stocks = parameters["max_stocks"]
+        if isinstance(max_stocks, str) and max_stocks.lower() == 'inf':
+            max_stocks = float('inf')
+        return {
+            "initial_balance": self.validate_initial_balance(parameters["initial_balance"]),
+            "fee_rate": self.validate_fee_rate(parameters["fee_rate"]),
+            "invest_ratio": self.validate_invest_ratio(parameters["invest_ratio"]),
+            "rebalance_period": self.validate_rebalance_period(parameters["rebalance_period"]),
+            "max_stocks": self.validate_max_stocks(max_stocks)
+        }
+
+    def add_portfolio_arguments(self, parser):
+        """给命令行解析器加上投资组合参数 --initial-balance、--fee-rate、--invest-ratio、--rebalance-period、--max-stocks。"""
+        defaults = DEFAULT_PORTFOLIO_PARAMETERS
+        parser.add_argument("--initial-balance", type=float, default=defaults["initial_balance"])
+        parser.add_argument("--fee-rate", type=float, default=defaults["fee_rate"])
+        parser.add_argument("--invest-ratio", type=float, default=defaults["invest_ratio"])
+        parser.add_argument("--rebalance-period", type=int, default=defaults["rebalance_period"])
+        parser.add_argument("--max-stocks", type=float, default=defaults["max_stocks"], help="inf 表示不限制")
+
+    def portfolio_parameters_from_args(self, args):
+        """从 add_portfolio_arguments 解析出的参数中取出并验证投资组合参数。"""
+        return self.validate_portfolio_parameters({"initial_balance": args.initial_balance, "fee_rate": args.fee_rate,
+                                                   "invest_ratio": args.invest_ratio,
+                                                   "rebalance_period": args.rebalance_period,
+                                                   "max_stocks": args.max_stocks})
+
 
 # 示例调用
 if __name__ == "__main__":
@@ -0,0 +1,314 @@
+import argparse
+import asyncio
+import json
+import os
+import time
+from array import array
+import numpy as np
+from DQNEnv import DQNEnv
+from FileIOClass import ColumnarDataset
+from InputHandler import InputHandler
+from ObservationBuilder import ObservationBuilder
+from PPOEnv import PPOEnv
+
+# 队列满时的处理方式
+BACKPRESSURE = ("block", "drop_oldest", "conflate")
+
+
+async def replay_bars(data, columns=PPOEnv.OBS_COLUMNS, rate=None):
+    """
+    按行回放数据集中的行情。
+
+    参数:
+        data (pd.DataFrame or ColumnarDataset): 行情数据。
+        columns (list): 每条行情包含的列。
+        rate (float): 每秒回放的条数，None 表示不限速。
+
+    返回:
+        一个异步生成器，每次产生一条float64行情数组。
+    """
+    matrix = np.column_stack([np.asarray(data[name], dtype=np.float64) for name in columns])
+    interval = 1.0 / rate if rate else 0.0
+    start = time.perf_counter()
+    for i, bar in enumerate(matrix):
+        yield bar
+        if not rate:
+            await asyncio.sleep(0)
+            continue
+        # 按开始时间计算下一条的发送时刻，避免累积误差；已经过了发送时刻的行情连续发出，与行情积压在socket缓冲区中一样
+        delay = start + (i + 1) * interval - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+async def serve_replay(data, columns=PPOEnv.OBS_COLUMNS, host="127.0.0.1", port=0, rate=None):
+    """
+    启动本地行情回放服务，作为实时行情源的替身：每个连接按行收到JSON数组格式的行情，发送完后关闭连接。
+
+    返回:
+        server (asyncio.Server): port=0 时实际端口为 server.sockets[0].getsockname()[1]。
+    """
+    async def handle(reader, writer):
+        async for bar in replay_bars(data, columns, rate):
+            writer.write((json.dumps(bar.tolist()) + "\n").encode())
+            await writer.drain()
+        writer.close()
+        await writer.wait_closed()
+    return await asyncio.start_server(handle, host, port)
+
+
+async def socket_bars(host, port):
+    """从 serve_replay（或任何按行发送JSON数组的服务）读取行情，连接关闭时结束。"""
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            yield np.array(json.loads(line), dtype=np.float64)
+    finally:
+        writer.close()
+
+
+class LiveRunner:
+    """
+    实时/回放交易循环：行情由异步生产者放入有界队列，消费者逐条更新环境状态并对每条行情做一次决策。
+
+    环境建立在预先分配的容量缓冲区上（feature_matrix 和收盘价数组），新行情只写入下一行，
+    技术指标由 ObservationBuilder 增量更新，观测写入预分配的数组，决策路径上没有按行情数量增长的复制。
+    记录每条行情从到达到得出动作的延迟，推理跟不上行情时按 backpressure 处理：
+        "block"：生产者等待队列有空位，不丢行情；
+        "drop_oldest"：丢弃队列中最旧的行情，丢弃的行情不计入状态；
+        "conflate"：消费者把已到达的行情全部计入状态，只对最新一条做决策。
+    """
+
+    def __init__(self, policy, model_choice, parameters, columns=PPOEnv.OBS_COLUMNS, capacity=1000000,
+                 indicators=None, queue_size=1024, backpressure="block"):
+        """
+        参数:
+            policy: 有 predict(obs, deterministic=True) 方法的模型，例如训练好的 DQN / PPO。
+            model_choice (str): "DQN" 或 "PPO"，决定观测格式和交易规则。
+            parameters (dict): 投资组合参数，格式与 InputHandler.get_portfolio_parameters 的返回值相同。
+            columns (list): 每条行情的列，须与训练数据的观测列一致，且包含Close。
+            capacity (int): 最多接收的行情条数，达到后环境结束。
+            indicators (dict): 与 TrainingPipeline 相同的 ObservationBuilder 参数，训练时使用了指标才需要指定。
+            queue_size (int): 行情队列的长度。
+            backpressure (str): 队列满时的处理方式，见 BACKPRESSURE。
+        """
+        if model_choice not in ("DQN", "PPO"):
+            raise ValueError("模型必须是 'DQN' 或 'PPO'。")
+        if backpressure not in BACKPRESSURE:
+            raise ValueError(f"backpressure 必须是 {BACKPRESSURE} 之一。")
+        if "Close" not in columns:
+            raise ValueError("行情列中必须包含Close。")
+        self.policy = policy
+        self.model_choice = model_choice
+        self.parameters = parameters
+        self.columns = list(columns)
+        self.capacity = capacity
+        self.indicators = indicators
+        self.queue_size = queue_size
+        self.backpressure = backpressure
+        self._close_column = self.columns.index("Close")
+
+        # 环境直接引用这两块缓冲区：收盘价已是连续的float64，环境不会再复制
+        self._features = np.zeros((capacity, len(self.columns)), dtype=np.float32)
+        self._close = np.zeros(capacity, dtype=np.float64)
+        env_class = DQNEnv if model_choice == 'DQN' else PPOEnv
+        self.env = env_class(ColumnarDataset({"Close": self._close}),
+                             initial_balance=parameters['initial_balance'], fee_rate=parameters['fee_rate'],
+                             invest_ratio=parameters['invest_ratio'],
+                             rebalance_period=parameters['rebalance_period'],
+                             max_stocks=parameters['max_stocks'], feature_matrix=self._features)
+        # 指标由这里逐条更新，而不是交给环境：环境在一步结束时会读取尚未到达的下一条收盘价
+        self.observation_builder = ObservationBuilder(**indicators) if indicators is not None else None
+        n_indicators = self.observation_builder.n_features if self.observation_builder is not None else 0
+        self._env_size = self.env.observation_space.shape[0]
+        self._obs = np.zeros(self._env_size + n_indicators, dtype=np.float32)
+        # 训练时的观测配置（指标、特征列）与这里不一致时，在开始回放前就报错
+        policy_shape = getattr(policy, "observation_shape", None)
+        if policy_shape is None and hasattr(policy, "observation_space"):
+            policy_shape = policy.observation_space.shape
+        if policy_shape is not None and tuple(int(n) for n in policy_shape) != self._obs.shape:
+            raise ValueError(f"策略的观测形状 {tuple(int(n) for n in policy_shape)} 与行情列和指标组成的观测 {self._obs.shape} 不一致，"
+                             f"请检查 columns 和 indicators 是否与训练时相同。")
+        self.reset()
+
+    def reset(self):
+        """清空已接收的行情、账户状态和统计数据。"""
+        self.env.reset()
+        if self.observation_builder is not None:
+            self.observation_builder.reset()
+        self._rows = 0
+        self._done = False
+        self.latency = array('d')
+        self.days = array('l')
+        self.total_asset = array('d')
+        self.portfolios = array('d')
+        self.ticks = 0
+        self.dropped = 0
+        self.conflated = 0
+
+    def _append(self, bar):
+        """把一条行情写入缓冲区的下一行并更新指标，返回行号；缓冲区已满时返回None。"""
+        row = self._rows
+        if row >= self.capacity:
+            return None
+        self._features[row] = bar
+        self._close[row] = bar[self._close_column]
+        if self.observation_builder is not None:
+            self.observation_builder.update(self._close[row])
+        self._rows = row + 1
+        return row
+
+    def _decide(self, seq, received, row):
+        """在第 row 行做一次决策并执行；未到调仓日或环境已结束时跳过。"""
+        env = self.env
+        if row is None or self._done or row < env.current_step:
+            return
+        # 合并行情后可能越过了调仓日，直接在最新一行决策
+        obs = env.seek(row)
+        if self.observation_builder is not None:
+            self._obs[:self._env_size] = obs
+            self._obs[self._env_size:] = self.observation_builder.values
+            obs = self._obs
+        action = self.policy.predict(obs, deterministic=True)[0]
+        self.latency.append(time.perf_counter() - received)
+        _, _, self._done, info = env.step(action)
+        # 环境的 day 是缓冲区行号，换算为行情源中的序号（丢弃过行情时两者不同）
+        self.days.append(info['day'] + seq - row)
+        self.total_asset.append(info['total_asset'])
+        self.portfolios.append(info['portfolio'])
+
+    async def _produce(self, source, queue):
+        seq = 0
+        try:
+            async for bar in source:
+                item = (seq, time.perf_counter(), bar)
+                seq += 1
+                if self.backpressure == "drop_oldest" and queue.full():
+                    queue.get_nowait()
+                    self.dropped += 1
+                await queue.put(item)
+        except Exception:
+            # 行情源出错时也让消费者结束，异常由 run 重新抛出
+            await queue.put(None)
+            raise
+        await queue.put(None)
+
+    async def _consume(self, queue):
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            self.ticks += 1
+            if self.backpressure == "conflate":
+                # 已经排队的行情只计入状态，决策留给最新的一条
+                while not queue.empty():
+                    pending = queue.get_nowait()
+                    if pending is None:
+                        queue.put_nowait(None)
+                        break
+                    self._append(item[2])
+                    self.conflated += 1
+                    self.ticks += 1
+                    item = pending
+            seq, received, bar = item
+            self._decide(seq, received, self._append(bar))
+
+    async def run(self, source):
+        """
+        运行交易循环直到行情源结束。
+
+        参数:
+            source: 产生行情数组的异步迭代器，例如 replay_bars 或 socket_bars。
+
+        返回:
+            result (dict): 与 TrainingPipeline.backtest 相同的 days（行情序号）、total_asset、portfolios 数组，
+                           以及 latency（行情到决策的延迟分位数，秒）、ticks、dropped、conflated 计数。
+        """
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        producer = asyncio.ensure_future(self._produce(source, queue))
+        try:
+            await self._consume(queue)
+        finally:
+            if not producer.done():
+                producer.cancel()
+        if not producer.cancelled():
+            producer.result()
+        return self.result()
+
+    def result(self):
+        """当前为止的决策记录和延迟统计。"""
+        return {"days": np.array(self.days), "total_asset": np.array(self.total_asset),
+                "portfolios": np.array(self.portfolios), "latency": self.latency_stats(),
+                "ticks": self.ticks, "dropped": self.dropped, "conflated": self.conflated}
+
+    def latency_stats(self):
+        """行情到决策延迟的次数、均值和分位数（秒）。"""
+        values = np.frombuffer(self.latency, dtype=np.float64)
+        if len(values) == 0:
+            return {"count": 0}
+        p50, p90, p99 = np.percentile(values, [50, 90, 99])
+        return {"count": int(len(values)), "mean": float(values.mean()), "p50": float(p50), "p90": float(p90),
+                "p99": float(p99), "max": float(values.max())}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="用训练好的模型回放行情并统计决策延迟")
+    parser.add_argument("model_path", help="model.save 保存的模型文件，或 PolicyExport 导出的 .npz 策略")
+    parser.add_argument("data", help="回放的行情文件（列式文件或CSV）")
+    parser.add_argument("--model", default="DQN", choices=["DQN", "PPO"])
+    parser.add_argument("--rate", type=float, default=None, help="每秒回放的行情条数，默认不限速")
+    parser.add_argument("--socket", action="store_true", help="通过本地socket回放，而不是直接读文件")
+    parser.add_argument("--queue-size", type=int, default=1024)
+    parser.add_argument("--backpressure", default="block", choices=BACKPRESSURE)
+    parser.add_argument("--indicators", default=None,
+                        help="训练时使用的 ObservationBuilder 参数（JSON），'{}' 表示默认指标")
+    parser.add_argument("--meta", default=None,
+                        help="ModelCache 写出的 meta.json，默认使用模型文件同目录下的 meta.json；存在时投资组合参数、"
+                             "指标和模型类型都以它为准")
+    handler = InputHandler()
+    handler.add_portfolio_arguments(parser)
+    args = parser.parse_args()
+
+    from DatasetRegistry import get_default_registry
+
+    data = get_default_registry().get(args.data).as_dataset()
+    model_choice = args.model
+    parameters = handler.portfolio_parameters_from_args(args)
+    indicators = json.loads(args.indicators) if args.indicators is not None else None
+    meta_file = args.meta or os.path.join(os.path.dirname(os.path.abspath(args.model_path)), "meta.json")
+    if os.path.exists(meta_file):
+        with open(meta_file) as file:
+            meta = json.load(file)
+        if meta.get("features") is not None:
+            raise ValueError("实时回放只支持原始行情列和技术指标，不支持用 FeatureStore 特征训练的模型。")
+        if "parameters" in meta:
+            model_choice = meta.get("model_choice", model_choice)
+            parameters = handler.validate_portfolio_parameters(meta["parameters"])
+            indicators = meta.get("indicators")
+            print(f"使用 {meta_file} 中的训练配置：{model_choice}，{parameters}，指标 {indicators}")
+    if args.model_path.endswith(".npz"):
+        # 导出的NumPy策略不需要导入torch，启动更快
+        from PolicyExport import NumpyPolicy
+        model = NumpyPolicy.load(args.model_path)
+    else:
+        from stable_baselines3 import DQN, PPO
+        model = (DQN if model_choice == 'DQN' else PPO).load(args.model_path)
+    runner = LiveRunner(model, model_choice, parameters, capacity=len(data), indicators=indicators,
+                        queue_size=args.queue_size, backpressure=args.backpressure)
+
+    async def main():
+        if not args.socket:
+            return await runner.run(replay_bars(data, rate=args.rate))
+        server = await serve_replay(data, rate=args.rate)
+        async with server:
+            return await runner.run(socket_bars("127.0.0.1", server.sockets[0].getsockname()[1]))
+
+    result = asyncio.run(main())
+    print(f"行情 {result['ticks']} 条，决策 {len(result['days'])} 次，丢弃 {result['dropped']}，合并 {result['conflated']}")
+    for name, value in result["latency"].items():
+        print(f"{name}: {value * 1e6:.1f} us" if name != "count" else f"{name}: {value}")
+    if len(result['total_asset']):
+        print(f"Final Profit: {(result['total_asset'][-1] - parameters['initial_balance']):.2f}")
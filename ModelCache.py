@@ -0,0 +1,99 @@
+import glob
+import hashlib
+import json
+import os
+import re
+import shutil
+import numpy as np
+
+class ModelCache:
+    """
+    训练好的模型缓存：键由 (模型, 超参数, 投资组合参数, 训练数据哈希) 计算得到，相同配置再次运行时直接加载而不重新训练。
+
+    每个键对应目录 cache_dir/<键>/，其中 model.zip 为训练完成的模型，meta.json 记录生成它的配置，
+    checkpoints/ 保存训练中途的检查点，用于中断后继续训练。
+    """
+
+    def __init__(self, cache_dir="model_cache"):
+        """
+        参数:
+            cache_dir (str): 缓存目录。
+        """
+        self.cache_dir = cache_dir
+
+    def data_hash(self, data):
+        """
+        训练数据的哈希，数据内容或列名任何改变都会得到不同的值。
+
+        参数:
+            data (pd.DataFrame or ColumnarDataset): 行情数据。
+        """
+        digest = hashlib.sha256()
+        for name in data.columns:
+            column = np.asarray(data[name])
+            digest.update(str(name).encode())
+            if column.dtype.kind in "biuf":
+                digest.update(np.ascontiguousarray(column, dtype=np.float64).view(np.uint8))
+            else:
+                digest.update("\0".join(map(str, column)).encode())
+        return digest.hexdigest()
+
+    def key(self, model_choice, hyperparameters, parameters, data_hash):
+        """
+        缓存键。
+
+        参数:
+            model_choice (str): "DQN" 或 "PPO"。
+            hyperparameters (dict): 影响训练结果的模型超参数和训练步数。
+            parameters (dict): 投资组合参数。
+            data_hash (str): data_hash 的返回值。
+
+        返回:
+            key (str): 十六进制哈希字符串。
+        """
+        config = {"model_choice": model_choice, "hyperparameters": hyperparameters, "parameters": parameters,
+                  "data": data_hash}
+        return hashlib.sha256(json.dumps(config, sort_keys=True, default=str).encode()).hexdigest()[:32]
+
+    def entry_dir(self, key):
+        return os.path.join(self.cache_dir, key)
+
+    def model_path(self, key):
+        return os.path.join(self.entry_dir(key), "model.zip")
+
+    def checkpoint_dir(self, key):
+        return os.path.join(self.entry_dir(key), "checkpoints")
+
+    def contains(self, key):
+        return os.path.exists(self.model_path(key))
+
+    def load(self, key, model_class, env=None):
+        """加载缓存的模型，不存在时返回None。"""
+        if not self.contains(key):
+            return None
+        return model_class.load(self.model_path(key), env=env)
+
+    def save(self, model, key, metadata=None):
+        """保存训练完成的模型和配置信息，并删除该键的中途检查点。"""
+        os.makedirs(self.entry_dir(key), exist_ok=True)
+        model.save(self.model_path(key))
+        with open(os.path.join(self.entry_dir(key), "meta.json"), "w") as file:
+            json.dump(dict(metadata or {}, num_timesteps=int(model.num_timesteps)), file, indent=2, default=str)
+        shutil.rmtree(self.checkpoint_dir(key), ignore_errors=True)
+
+    def latest_checkpoint(self, key):
+        """
+        最近一次的检查点。
+
+        返回:
+            checkpoint (tuple): (模型文件, 回放缓冲区文件或None, 已训练步数)，没有检查点时返回None。
+        """
+        latest = None
+        for path in glob.glob(os.path.join(self.checkpoint_dir(key), "checkpoint_*_steps.zip")):
+            match = re.search(r"checkpoint_(\d+)_steps\.zip$", path)
+            if match and (latest is None or int(match.group(1)) > latest[2]):
+                latest = (path, None, int(match.group(1)))
+        if latest is None:
+            return None
+        buffer_path = os.path.join(self.checkpoint_dir(key), f"checkpoint_replay_buffer_{latest[2]}_steps.pkl")
+        return latest[0], buffer_path if os.path.exists(buffer_path) else None, latest[2]
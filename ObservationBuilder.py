@@ -0,0 +1,202 @@
+import math
+import numpy as np
+
+class ObservationBuilder:
+    """
+    增量计算的滚动技术指标，供 DQNEnv / PPOEnv 拼接到观测后面。
+
+    指标都基于收盘价：简单移动平均、RSI（窗口内平均涨跌幅）、对数收益率波动率和滞后收益率。
+    每来一根新K线只做常数次运算：价格、涨跌和收益率保存在环形缓冲区中，窗口和用滚动求和维护，
+    因此每步的耗时与窗口长度无关。一个实例保存一条价格序列的状态，每个环境需要单独的实例。
+    """
+
+    def __init__(self, sma_windows=(5, 20), rsi_window=14, volatility_window=20, lags=(1, 5)):
+        """
+        参数:
+            sma_windows (tuple): 移动平均的窗口长度。
+            rsi_window (int): RSI的窗口长度，为None时不计算。
+            volatility_window (int): 波动率（对数收益率标准差）的窗口长度，为None时不计算。
+            lags (tuple): 滞后收益率的间隔，例如1表示相对前一天的涨跌幅。
+        """
+        windows = list(sma_windows) + list(lags) + [w for w in (rsi_window, volatility_window) if w is not None]
+        if any(not isinstance(w, (int, np.integer)) or w < 1 for w in windows):
+            raise ValueError("指标的窗口长度必须是正整数。")
+        self.sma_windows = tuple(int(w) for w in sma_windows)
+        self.rsi_window = rsi_window
+        self.volatility_window = volatility_window
+        self.lags = tuple(int(k) for k in lags)
+        # 环形缓冲区比最长的窗口多一格，覆盖最旧的元素时它已经不在任何窗口中
+        self.capacity = max(windows, default=1) + 1
+
+        self.feature_names = [f"SMA_{w}" for w in self.sma_windows]
+        # 生成的数据中收盘价可能为负，均价和滞后收益率不设下界
+        low = [-np.inf] * len(self.sma_windows)
+        high = [np.inf] * len(self.sma_windows)
+        if rsi_window is not None:
+            self.feature_names.append(f"RSI_{rsi_window}")
+            low.append(0.0)
+            high.append(100.0)
+        if volatility_window is not None:
+            self.feature_names.append(f"Volatility_{volatility_window}")
+            low.append(0.0)
+            high.append(np.inf)
+        self.feature_names += [f"Return_{k}" for k in self.lags]
+        low += [-np.inf] * len(self.lags)
+        high += [np.inf] * len(self.lags)
+        self.n_features = len(self.feature_names)
+        self.low = np.array(low, dtype=np.float32)
+        self.high = np.array(high, dtype=np.float32)
+        self.reset()
+
+    def reset(self):
+        """清空所有缓冲区，开始新的价格序列。"""
+        self._prices = [0.0] * self.capacity
+        self._gains = [0.0] * self.capacity
+        self._losses = [0.0] * self.capacity
+        self._returns = [0.0] * self.capacity
+        self._pos = -1
+        self._count = 0
+        self._sma_sums = [0.0] * len(self.sma_windows)
+        self._gain_sum = 0.0
+        self._loss_sum = 0.0
+        self._return_sum = 0.0
+        self._return_sq_sum = 0.0
+        self.values = [0.0] * self.n_features
+
+    def update(self, price):
+        """
+        加入一根新K线的收盘价并更新全部指标，结果保存在 values 中。
+
+        参数:
+            price (float): 收盘价。
+        """
+        price = float(price)
+        capacity = self.capacity
+        prices = self._prices
+        t = self._count  # 新价格的序号
+        pos = (self._pos + 1) % capacity
+
+        if t > 0:
+            previous = prices[self._pos]
+            change = price - previous
+            log_return = math.log(price / previous) if price > 0 and previous > 0 else 0.0
+        else:
+            change = 0.0
+            log_return = 0.0
+        prices[pos] = price
+        self._gains[pos] = change if change > 0 else 0.0
+        self._losses[pos] = -change if change < 0 else 0.0
+        self._returns[pos] = log_return
+        self._pos = pos
+        self._count = t + 1
+
+        values = self.values
+        i = 0
+        for j, w in enumerate(self.sma_windows):
+            total = self._sma_sums[j] + price
+            if t >= w:
+                total -= prices[(pos - w) % capacity]
+            self._sma_sums[j] = total
+            values[i] = total / min(t + 1, w)
+            i += 1
+
+        if self.rsi_window is not None:
+            n = self.rsi_window
+            if t >= 1:
+                self._gain_sum += self._gains[pos]
+                self._loss_sum += self._losses[pos]
+            if t - n >= 1:
+                old = (pos - n) % capacity
+                self._gain_sum = max(self._gain_sum - self._gains[old], 0.0)
+                self._loss_sum = max(self._loss_sum - self._losses[old], 0.0)
+            moves = self._gain_sum + self._loss_sum
+            values[i] = 100.0 * self._gain_sum / moves if moves > 0 else 50.0
+            i += 1
+
+        if self.volatility_window is not None:
+            n = self.volatility_window
+            if t >= 1:
+                self._return_sum += log_return
+                self._return_sq_sum += log_return * log_return
+            if t - n >= 1:
+                old = self._returns[(pos - n) % capacity]
+                self._return_sum -= old
+                self._return_sq_sum -= old * old
+            m = min(t, n)
+            if m >= 2:
+                mean = self._return_sum / m
+                values[i] = math.sqrt(max(self._return_sq_sum / m - mean * mean, 0.0))
+            else:
+                values[i] = 0.0
+            i += 1
+
+        for k in self.lags:
+            if t >= k:
+                base = prices[(pos - k) % capacity]
+                values[i] = price / base - 1 if base > 0 else 0.0
+            else:
+                values[i] = 0.0
+            i += 1
+        return values
+
+    def update_many(self, prices):
+        """依次加入多根K线，例如调仓周期大于1时被跳过的那些交易日。"""
+        for price in prices:
+            self.update(price)
+        return self.values
+
+    def compute(self, prices):
+        """
+        对整条价格序列一次性向量化计算全部指标，第t行与依次 update 到第t根K线后的 values 相同（仅有浮点舍入误差，
+        见 EquivalenceChecks.check_indicators）。
+
+        参数:
+            prices (array-like): 收盘价序列。
+
+        返回:
+            features (np.ndarray): 形状为 (len(prices), n_features) 的float64矩阵，列顺序与 feature_names 一致。
+        """
+        prices = np.asarray(prices, dtype=np.float64)
+        n_rows = len(prices)
+        t = np.arange(n_rows)
+        columns = []
+
+        def window_sum(values, w, first=0):
+            # values[first:] 在窗口 (t-w, t] 内的和，用前缀和相减得到
+            cumsum = np.concatenate(([0.0], np.cumsum(values)))
+            return cumsum[t + 1] - cumsum[np.maximum(t + 1 - w, first)]
+
+        for w in self.sma_windows:
+            columns.append(window_sum(prices, w) / np.minimum(t + 1, w))
+
+        previous = np.concatenate((prices[:1], prices[:-1]))
+        change = prices - previous
+        if self.rsi_window is not None:
+            gains = window_sum(np.maximum(change, 0.0), self.rsi_window)
+            losses = window_sum(np.maximum(-change, 0.0), self.rsi_window)
+            moves = gains + losses
+            with np.errstate(divide='ignore', invalid='ignore'):
+                columns.append(np.where(moves > 0, 100.0 * gains / moves, 50.0))
+
+        if self.volatility_window is not None:
+            valid = (prices > 0) & (previous > 0)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                log_return = np.where(valid, np.log(np.where(valid, prices / previous, 1.0)), 0.0)
+            log_return[:1] = 0.0
+            n = self.volatility_window
+            m = np.minimum(t, n)
+            total = window_sum(log_return, n)
+            total_sq = window_sum(log_return * log_return, n)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                mean = total / m
+                variance = np.maximum(total_sq / m - mean * mean, 0.0)
+            columns.append(np.where(m >= 2, np.sqrt(np.where(m >= 2, variance, 0.0)), 0.0))
+
+        for k in self.lags:
+            base = np.concatenate((np.zeros(min(k, n_rows)), prices[:-k] if k < n_rows else []))
+            with np.errstate(divide='ignore', invalid='ignore'):
+                columns.append(np.where((t >= k) & (base > 0), prices / np.where(base > 0, base, 1.0) - 1, 0.0))
+
+        if not columns:
+            return np.zeros((n_rows, 0))
+        return np.column_stack(columns)
@@ -0,0 +1,126 @@
+import math
+import numpy as np
+
+class OrderExecutionEngine:
+    """
+    订单执行引擎：DQNEnv、PPOEnv 和 VecTradingEnv 共用的成交逻辑。
+
+    买入数量按闭式公式一次算出：在 余额×invest_ratio 的预算内、计入手续费后能负担的最大整数股，并且不超过 max_stocks 的持仓上限；
+    卖出为清空持仓。所有计算既可以用于单个订单（标量），也可以用于一批订单（numpy数组）。
+    与原来逐股递减的买入循环的比较见 EquivalenceChecks.check_order_sizing：DQN语义完全相同，PPO语义只在手续费率大于0时有意不同。
+    """
+
+    def __init__(self, fee_rate=0, invest_ratio=1.0, max_stocks=float('inf')):
+        """
+        参数:
+            fee_rate (float): 手续费率，买入和卖出均按成交金额收取。
+            invest_ratio (float): 每次买入最多使用的余额比例。
+            max_stocks (int or float): 最多持有的股票数量，float('inf') 表示不限制。
+        """
+        self.fee_rate = fee_rate
+        self.invest_ratio = invest_ratio
+        self.max_stocks = max_stocks
+
+    def buy_cost(self, quantity, price):
+        """买入 quantity 股需要支付的总金额（含手续费）。"""
+        return quantity * price * (1 + self.fee_rate)
+
+    def sell_proceeds(self, quantity, price):
+        """卖出 quantity 股得到的净收入（扣除手续费）。"""
+        return quantity * price * (1 - self.fee_rate)
+
+    def fee(self, quantity, price):
+        """成交 quantity 股的手续费。"""
+        return quantity * price * self.fee_rate
+
+    def buy_quantity(self, balance, price, holdings):
+        """
+        单个订单的最大可买数量。
+
+        参数:
+            balance (float): 当前余额。
+            price (float): 成交价格。
+            holdings (int): 当前持仓数量。
+
+        返回:
+            quantity (int): 可以买入的股数，不可买时为0。
+        """
+        if price <= 0:
+            return 0
+        budget = balance * self.invest_ratio
+        # 不计手续费时的可买数量也作为上限，与逐股递减的旧逻辑在浮点边界上保持一致
+        limit = min(self.max_stocks - holdings, budget // price)
+        quantity = min(math.floor(budget / (price * (1 + self.fee_rate))), limit)
+        # 修正除法的浮点误差，保证结果是成本不超过预算的最大整数
+        if quantity > 0 and self.buy_cost(quantity, price) > budget:
+            quantity -= 1
+        elif quantity + 1 <= limit and self.buy_cost(quantity + 1, price) <= budget:
+            quantity += 1
+        return max(int(quantity), 0)
+
+    def buy_quantities(self, balance, price, holdings):
+        """buy_quantity 的数组版本，对一批订单同时计算最大可买数量。"""
+        budget = balance * self.invest_ratio
+        valid = price > 0
+        with np.errstate(divide='ignore', invalid='ignore'):
+            limit = np.minimum(self.max_stocks - holdings, budget // price)
+            quantity = np.minimum(np.floor(budget / (price * (1 + self.fee_rate))), limit)
+        quantity = np.where(valid, quantity, 0)
+        quantity -= (quantity > 0) & (self.buy_cost(quantity, price) > budget)
+        quantity += valid & (quantity + 1 <= limit) & (self.buy_cost(quantity + 1, price) <= budget)
+        return np.maximum(quantity, 0)
+
+    def execute(self, actions, balance, holdings, price):
+        """
+        对一批订单同时执行买入（0）、卖出（1）或持有（2）。
+
+        参数:
+            actions (np.ndarray): 每个订单的动作。
+            balance (np.ndarray): 每个账户的余额。
+            holdings (np.ndarray): 每个账户的持仓数量。
+            price (np.ndarray): 每个订单的成交价格。
+
+        返回:
+            balance (np.ndarray): 成交后的余额。
+            holdings (np.ndarray): 成交后的持仓数量。
+            quantity (np.ndarray): 成交数量，买入为正、卖出为负、未成交为0。
+            fee (np.ndarray): 每个订单的手续费。
+        """
+        buy = actions == 0
+        sell = (actions == 1) & (holdings > 0)
+        quantity = np.where(buy, self.buy_quantities(balance, price, holdings), 0)
+        quantity = np.where(sell, -holdings, quantity)
+
+        cost = np.where(quantity > 0, self.buy_cost(quantity, price), 0)
+        proceeds = np.where(quantity < 0, self.sell_proceeds(-quantity, price), 0)
+        balance = balance - cost + proceeds
+        holdings = holdings + quantity
+        return balance, holdings, quantity, self.fee(np.abs(quantity), price)
+
+
+def mark_to_market(close, total_asset, portfolios, rebalance_period, end):
+    """
+    把从第0天开始、每 rebalance_period 天一次的调仓记录展开为逐日记录：两次调仓之间余额和持仓不变，按当天收盘价计算总资产。
+    结果与调仓日之间持有的逐日环境一致，见 EquivalenceChecks.check_frame_skip。
+
+    参数:
+        close (np.ndarray): 收盘价。
+        total_asset (array): 每次调仓成交后的总资产。
+        portfolios (array): 每次调仓成交后的持仓。
+        rebalance_period (int): 调仓周期。
+        end (int): 最后一次调仓的持仓持有到第 end 天之前（不含）。
+
+    返回:
+        result (dict): 逐日的 days、total_asset、portfolios。
+    """
+    total_asset = np.asarray(total_asset, dtype=np.float64)
+    portfolios = np.asarray(portfolios, dtype=np.float64)
+    starts = np.arange(len(total_asset)) * rebalance_period
+    lengths = np.diff(np.append(starts, end))
+    days = np.arange(end)
+    holdings = np.repeat(portfolios, lengths)
+    balance = total_asset - portfolios * close[starts]
+    equity = np.repeat(balance, lengths) + holdings * close[days]
+    # 调仓日直接使用记录的总资产，避免减去再加回持仓市值的舍入误差
+    equity[starts] = total_asset
+    return {"days": days, "total_asset": equity, "portfolios": holdings}
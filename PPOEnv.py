@@ -1,80 +1,125 @@
 import numpy as np
 from gym import spaces
 import gym
+from OrderExecution import OrderExecutionEngine, mark_to_market
 
 class PPOEnv(gym.Env):
-    def __init__(self, df, initial_balance=10000, rebalance_period=1, invest_ratio=0.1, max_stocks=100, fee_rate=0.001):
+    OBS_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+    def __init__(self, df, initial_balance=10000, rebalance_period=1, invest_ratio=0.1, max_stocks=100, fee_rate=0.001,
+                 observation_builder=None, feature_matrix=None, feature_bounds=None):
         super(PPOEnv, self).__init__()
         self.df = df
         self.action_space = spaces.Discrete(3)  # ['买入', '卖出', '持有']
-        self.observation_space = spaces.Box(low=0, high=np.inf, shape=(6,))
 
         # Customizable Parameters
         self.initial_balance = initial_balance
-        self.rebalance_period = rebalance_period  # How often to rebalance portfolio (in days)
+        self.rebalance_period = rebalance_period  # How often to rebalance portfolio (in days); days between are skipped
         self.investment_ratio = invest_ratio  # Percentage of balance to invest
         self.max_shares = max_stocks  # Max number of shares that can be held
         self.transaction_fee_ratio = fee_rate  # Transaction fee ratio (e.g., 0.001 means 0.1%)
+        self.order_engine = OrderExecutionEngine(fee_rate=fee_rate, invest_ratio=invest_ratio, max_stocks=max_stocks)
+
+        self._n_steps = len(df)
+        if feature_matrix is not None:
+            # Precomputed features (e.g. a read-only FeatureStore memmap) replace OBS_COLUMNS; rows are sliced directly
+            if len(feature_matrix) != self._n_steps:
+                raise ValueError("feature_matrix must have one row per row of df.")
+            self._features = feature_matrix
+        else:
+            # Convert the DataFrame once into a contiguous float32 matrix of the observed columns
+            self._features = np.ascontiguousarray(df[self.OBS_COLUMNS].to_numpy(dtype=np.float32))
+        self._n_features = self._features.shape[1]
+        # Keep a float64 copy of Close so accounting matches the per-row lookups exactly
+        # (see EquivalenceChecks.check_env_fast_path)
+        self._close = np.ascontiguousarray(df['Close'], dtype=np.float64)
+        # Optional rolling indicators (ObservationBuilder) appended after the balance
+        self.observation_builder = observation_builder
+        n_indicators = observation_builder.n_features if observation_builder is not None else 0
+        # Preallocated observation buffer: [Open, High, Low, Close, Volume, Balance, indicators...]
+        self._obs = np.zeros(self._n_features + 1 + n_indicators, dtype=np.float32)
+        low = np.zeros(self._obs.shape, dtype=np.float32)
+        high = np.full(self._obs.shape, np.inf, dtype=np.float32)
+        if feature_bounds is not None:
+            # (low, high) of the feature columns, e.g. FeatureStore.bounds; defaults to [0, inf) like the raw columns
+            low[:self._n_features], high[:self._n_features] = feature_bounds
+        if n_indicators:
+            low[-n_indicators:] = observation_builder.low
+            high[-n_indicators:] = observation_builder.high
+        self.observation_space = spaces.Box(low=low, high=high, dtype=np.float32)
 
         # Initialize environment state
         self.reset()
 
+    def seek(self, step):
+        """Move to row `step` and return its observation in the preallocated buffer (e.g. the newest live bar)."""
+        self.current_step = step
+        return self._next_observation()
+
     def reset(self):
         self.current_step = 0
         self.balance = self.initial_balance
         self.shares_held = 0
         self.total_asset = self.balance
-        return self._next_observation()
+        if self.observation_builder is not None:
+            self.observation_builder.reset()
+            self.observation_builder.update(self._close[0])
+        # Fresh array on reset so a terminal observation held by a VecEnv is not overwritten
+        return self._next_observation(np.empty_like(self._obs))
 
-    def _next_observation(self):
-        # Observation includes: Open, High, Low, Close, Volume, Current Balance
-        obs = np.array([
-            self.df.iloc[self.current_step]['Open'],
-            self.df.iloc[self.current_step]['High'],
-            self.df.iloc[self.current_step]['Low'],
-            self.df.iloc[self.current_step]['Close'],
-            self.df.iloc[self.current_step]['Volume'],
-            self.balance
-        ])
+    def _next_observation(self, obs=None):
+        # Observation includes: Open, High, Low, Close, Volume, Current Balance (+ optional indicators)
+        # Written into the preallocated buffer by default; copy it if you need to keep it
+        if obs is None:
+            obs = self._obs
+        obs[:self._n_features] = self._features[self.current_step]
+        obs[self._n_features] = self.balance
+        if self.observation_builder is not None:
+            obs[self._n_features + 1:] = self.observation_builder.values
         return obs
 
     def step(self, action):
-        current_price = self.df.iloc[self.current_step]['Close']
+        current_price = self._close[self.current_step]
         bought_shares = 0
         traded = False
         transaction_fee = 0
 
         # Action logic: Buy, Sell, or Hold
         if action == 0:  # Buy
-            # Calculate how many shares to buy based on the investment ratio
-            max_investment = self.balance * self.investment_ratio
-            potential_shares = max_investment // current_price
-            bought_shares = min(potential_shares, self.max_shares - self.shares_held)
-
-            # Ensure the transaction fee is accounted for
-            total_cost = bought_shares * current_price
-            transaction_fee = total_cost * self.transaction_fee_ratio
-            if bought_shares > 0 and self.balance >= (total_cost + transaction_fee):
-                self.balance -= (total_cost + transaction_fee)
+            # Largest fee-inclusive quantity within the investment ratio and the share limit
+            bought_shares = self.order_engine.buy_quantity(self.balance, current_price, self.shares_held)
+            transaction_fee = self.order_engine.fee(bought_shares, current_price)
+            if bought_shares > 0:
+                self.balance -= self.order_engine.buy_cost(bought_shares, current_price)
                 self.shares_held += bought_shares
                 traded = True
 
         elif action == 1:  # Sell
             if self.shares_held > 0:
-                total_sale = self.shares_held * current_price
-                transaction_fee = total_sale * self.transaction_fee_ratio
-                self.balance += (total_sale - transaction_fee)
+                transaction_fee = self.order_engine.fee(self.shares_held, current_price)
+                self.balance += self.order_engine.sell_proceeds(self.shares_held, current_price)
                 self.shares_held = 0
                 traded = True
 
         # Update total asset
         self.total_asset = self.balance + self.shares_held * current_price
-        self.current_step += 1
+        day = self.current_step
+        # Jump straight to the next rebalance date; holdings are fixed in between
+        self.current_step = min(day + self.rebalance_period, self._n_steps - 1)
+        if self.observation_builder is not None:
+            # Skipped days still feed the rolling indicators
+            self.observation_builder.update_many(self._close[day + 1:self.current_step + 1].tolist())
 
-        done = self.current_step >= len(self.df) - 1
+        done = self.current_step >= self._n_steps - 1
 
         # Reward based on asset growth and trading
-        reward = self.total_asset - self.initial_balance
+        held_days = self.current_step - day
+        if held_days == 1:
+            reward = self.total_asset - self.initial_balance
+        else:
+            # Sum of the daily rewards over the held days; summing the Close slice needs no per-env copy of the series
+            held_value = self.shares_held * self._close[day:self.current_step].sum()
+            reward = held_days * (self.balance - self.initial_balance) + held_value
         if traded:
             reward += 500  # Additional reward for trading action
 
@@ -83,8 +128,20 @@ class PPOEnv(gym.Env):
 
         info = {
             'total_asset': self.total_asset,
+            'day': day,
+            'portfolio': self.shares_held,
             'bought_shares': bought_shares,
             'transaction_fee': transaction_fee
         }
 
-        return obs, reward, done, info
\ No newline at end of file
+        return obs, reward, done, info
+
+    def equity_curve(self, total_asset, portfolios):
+        """
+        Expand the per-rebalance total_asset and portfolios of one full episode into per-day records.
+
+        The last holdings are kept until the episode stops at day len(df) - 1, which is never traded.
+        Returns a dict of per-day days, total_asset and portfolios for Visualizer and StockLogger.
+        """
+        end = min(len(total_asset) * self.rebalance_period, self._n_steps - 1)
+        return mark_to_market(self._close, total_asset, portfolios, self.rebalance_period, end)
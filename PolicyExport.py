@@ -0,0 +1,140 @@
+import numpy as np
+
+# 导出时支持的激活函数（torch模块类名 -> 名称）
+ACTIVATIONS = {"ReLU": "relu", "Tanh": "tanh", "Identity": "identity"}
+
+
+def _linear_layers(modules):
+    """把 nn.Sequential 中的 Linear/激活模块整理为 [(权重, 偏置, 激活函数)]。"""
+    layers = []
+    for module in modules:
+        name = type(module).__name__
+        if name == "Linear":
+            layers.append([module.weight.detach().cpu().numpy(), module.bias.detach().cpu().numpy(), "identity"])
+        elif name in ACTIVATIONS and layers:
+            layers[-1][2] = ACTIVATIONS[name]
+        elif name not in ("Flatten", "Identity"):
+            raise ValueError(f"不支持导出的网络层：{name}")
+    return layers
+
+
+def export_policy(model, output_file):
+    """
+    把训练好的 DQN / PPO 策略网络导出为只依赖NumPy的 .npz 文件，由 NumpyPolicy 加载。
+
+    DQN 导出 q_net（argmax Q值即确定性动作），PPO 导出 mlp_extractor.policy_net 加 action_net（argmax logits）。
+    观测预处理只有转换为float32（一维Box观测的展平不改变数据）。
+
+    参数:
+        model: stable_baselines3 的 DQN 或 PPO 模型，动作空间须为 Discrete。
+        output_file (str): 输出文件路径。
+    """
+    policy = model.policy
+    if not hasattr(model.action_space, "n"):
+        raise ValueError("只支持离散动作空间的策略。")
+    if hasattr(policy, "q_net"):
+        algorithm = "DQN"
+        layers = _linear_layers(policy.q_net.q_net)
+    elif hasattr(policy, "mlp_extractor"):
+        algorithm = "PPO"
+        layers = _linear_layers(policy.mlp_extractor.policy_net) + _linear_layers([policy.action_net])
+    else:
+        raise ValueError("只支持 DQN 和 PPO 的 MlpPolicy。")
+
+    arrays = {"algorithm": np.array(algorithm),
+              "observation_shape": np.array(model.observation_space.shape, dtype=np.int64),
+              "n_actions": np.array(model.action_space.n, dtype=np.int64),
+              "activations": np.array([activation for _, _, activation in layers])}
+    for i, (weight, bias, _) in enumerate(layers):
+        arrays[f"weight_{i}"] = weight.astype(np.float32)
+        arrays[f"bias_{i}"] = bias.astype(np.float32)
+    np.savez(output_file, **arrays)
+
+
+class NumpyPolicy:
+    """
+    用NumPy实现的导出策略，不导入torch和stable_baselines3。
+
+    predict 的接口与 stable_baselines3 模型相同，可以直接传给 TrainingPipeline.backtest / backtest_batch 和 LiveRunner。
+    单条观测的前向计算写入预先分配的缓冲区，每层只有一次矩阵乘法和原地的偏置、激活计算。
+    """
+
+    def __init__(self, weights, biases, activations, observation_shape, algorithm=None):
+        """
+        参数:
+            weights (list): 各层 (输出维度, 输入维度) 的float32权重，与 torch.nn.Linear 相同。
+            biases (list): 各层的float32偏置。
+            activations (list): 各层的激活函数，"relu"、"tanh" 或 "identity"。
+            observation_shape (tuple): 观测的形状。
+            algorithm (str): 导出的算法名称，仅作记录。
+        """
+        for activation in activations:
+            if activation not in ACTIVATIONS.values():
+                raise ValueError(f"不支持的激活函数：{activation}")
+        # 转置后连续存储，前向计算为 x @ W.T
+        self._weights = [np.ascontiguousarray(weight.T, dtype=np.float32) for weight in weights]
+        self._biases = [np.asarray(bias, dtype=np.float32) for bias in biases]
+        self.activations = list(activations)
+        self.observation_shape = tuple(observation_shape)
+        self.algorithm = algorithm
+        self._input = np.zeros(self.observation_shape, dtype=np.float32)
+        self._buffers = [np.zeros(len(bias), dtype=np.float32) for bias in self._biases]
+
+    @classmethod
+    def load(cls, path):
+        """加载 export_policy 导出的文件。"""
+        with np.load(path) as data:
+            n_layers = len(data["activations"])
+            return cls([data[f"weight_{i}"] for i in range(n_layers)], [data[f"bias_{i}"] for i in range(n_layers)],
+                       [str(activation) for activation in data["activations"]], data["observation_shape"],
+                       str(data["algorithm"]))
+
+    def _forward(self, x, buffers=None):
+        for i, (weight, bias, activation) in enumerate(zip(self._weights, self._biases, self.activations)):
+            if buffers is None:
+                x = x @ weight
+            else:
+                x = np.dot(x, weight, out=buffers[i])
+            x += bias
+            if activation == "relu":
+                np.maximum(x, 0, out=x)
+            elif activation == "tanh":
+                np.tanh(x, out=x)
+        return x
+
+    def predict(self, observation, state=None, episode_start=None, deterministic=True):
+        """
+        计算确定性动作。
+
+        参数:
+            observation (np.ndarray): 单条观测或 (批大小, 观测维度) 的一批观测。
+
+        返回:
+            (action, None): 单条观测返回一个动作，批量观测返回动作数组，与 stable_baselines3 的返回值格式相同。
+        """
+        if not deterministic:
+            raise ValueError("NumpyPolicy 只支持确定性动作。")
+        observation = np.asarray(observation)
+        if observation.shape == self.observation_shape:
+            self._input[...] = observation
+            return np.argmax(self._forward(self._input, self._buffers)), None
+        if observation.shape[1:] != self.observation_shape:
+            raise ValueError(f"观测的形状 {observation.shape} 与策略的 {self.observation_shape} 不一致。")
+        return np.argmax(self._forward(observation.astype(np.float32)), axis=1), None
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="把训练好的模型导出为只依赖NumPy的策略文件")
+    parser.add_argument("model_path", help="model.save 保存的模型文件")
+    parser.add_argument("--model", default="DQN", choices=["DQN", "PPO"])
+    parser.add_argument("--output", default=None, help="输出文件，默认与模型文件同名的 .npz")
+    args = parser.parse_args()
+
+    from stable_baselines3 import DQN, PPO
+
+    model = (DQN if args.model == 'DQN' else PPO).load(args.model_path)
+    output_file = args.output or args.model_path.rsplit(".", 1)[0] + ".npz"
+    export_policy(model, output_file)
+    print(f"策略已导出到 {output_file}")
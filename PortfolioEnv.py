@@ -0,0 +1,172 @@
+import numpy as np
+import pandas as pd
+import gym
+from gym import spaces
+from OrderExecution import OrderExecutionEngine
+
+class PortfolioEnv(gym.Env):
+    """
+    多资产组合环境：一个现金账户在整个股票池上分配资金。
+
+    价格、持仓都以numpy数组保存，每一步对所有股票一次性完成下单、手续费和 max_stocks 限制的计算，
+    耗时随数组大小增长而不是随股票数量的Python循环增长。
+
+    action_type="discrete" 时动作为 MultiDiscrete，每只股票 0买入、1卖出（清仓）、2持有，
+    先执行卖出，再把 余额×invest_ratio 平均分给所有买入信号；
+    action_type="weights" 时动作为目标权重向量（最后一维为现金），按权重调仓到目标持仓。
+    """
+    OBS_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+    def __init__(self, data, initial_balance=10000, fee_rate=0.001, invest_ratio=1.0, rebalance_period=1,
+                 max_stocks=float('inf'), action_type="discrete"):
+        """
+        参数:
+            data (dict, list or pd.DataFrame): {股票代码: 行情DataFrame}、等长行情DataFrame的列表，
+                或 generate_panel_data 写出的长表（包含Date、Symbol列）。
+            initial_balance (float): 初始资金。
+            fee_rate (float): 手续费率，买卖均按成交金额收取。
+            invest_ratio (float): 可用于持仓的资金比例。
+            rebalance_period (int): 调仓周期（天）。
+            max_stocks (int or float): 每只股票最多持有的数量。
+            action_type (str): "discrete" 或 "weights"。
+        """
+        super(PortfolioEnv, self).__init__()
+        if action_type not in ("discrete", "weights"):
+            raise ValueError("action_type 必须是 'discrete' 或 'weights'。")
+        self.symbols, self._features, self._close = self._load(data)
+        self.initial_balance = initial_balance
+        self.fee_rate = fee_rate  # 手续费率
+        self.invest_ratio = invest_ratio  # 可投入资金比例
+        self.rebalance_period = rebalance_period  # 调仓周期
+        self.max_stocks = max_stocks  # 每只股票最多持有数量
+        self.action_type = action_type
+        self.order_engine = OrderExecutionEngine(fee_rate=fee_rate, invest_ratio=invest_ratio, max_stocks=max_stocks)
+
+        self._n_steps, self.n_assets, self._n_features = self._features.shape
+        # 预分配观测缓冲区：[各股票行情特征..., 各股票持仓..., 余额]
+        self._market_size = self.n_assets * self._n_features
+        self._obs = np.zeros(self._market_size + self.n_assets + 1, dtype=np.float32)
+
+        if action_type == "discrete":
+            self.action_space = spaces.MultiDiscrete([3] * self.n_assets)
+        else:
+            self.action_space = spaces.Box(low=0, high=1, shape=(self.n_assets + 1,), dtype=np.float32)
+        self.observation_space = spaces.Box(low=0, high=np.inf, shape=self._obs.shape, dtype=np.float32)
+        self.reset()
+
+    def _load(self, data):
+        """把输入数据整理为 (天数, 股票数, 特征) 的float32张量和 (天数, 股票数) 的float64收盘价。"""
+        if isinstance(data, dict):
+            symbols, frames = list(data), list(data.values())
+        elif isinstance(data, (list, tuple)):
+            symbols, frames = list(range(len(data))), list(data)
+        else:
+            # 长表：每行一个(日期, 股票)，转换为按股票分列的宽表
+            data = pd.DataFrame(data) if not isinstance(data, pd.DataFrame) else data
+            wide = data.pivot(index='Date', columns='Symbol', values=self.OBS_COLUMNS)
+            symbols = list(wide.columns.levels[1])
+            features = np.stack([wide[name].to_numpy(dtype=np.float32) for name in self.OBS_COLUMNS], axis=2)
+            return symbols, np.ascontiguousarray(features), np.ascontiguousarray(wide['Close'], dtype=np.float64)
+        if len({len(df) for df in frames}) != 1:
+            raise ValueError("所有行情数据的长度必须相同。")
+        features = np.stack([df[self.OBS_COLUMNS].to_numpy(dtype=np.float32) for df in frames], axis=1)
+        close = np.stack([np.asarray(df['Close'], dtype=np.float64) for df in frames], axis=1)
+        return symbols, np.ascontiguousarray(features), np.ascontiguousarray(close)
+
+    def reset(self):
+        self.current_step = 0
+        self.done = False
+        self.balance = float(self.initial_balance)
+        self.holdings = np.zeros(self.n_assets)
+        self.total_value = float(self.initial_balance)
+        # reset单独分配数组，避免覆盖向量化环境中仍被引用的终止观测
+        return self._next_observation(np.empty_like(self._obs))
+
+    def _next_observation(self, obs=None):
+        # 默认直接写入预分配的缓冲区，调用方如需保留观测请自行copy
+        if obs is None:
+            obs = self._obs
+        obs[:self._market_size] = self._features[self.current_step].reshape(-1)
+        obs[self._market_size:-1] = self.holdings
+        obs[-1] = self.balance
+        return obs
+
+    def step(self, action):
+        price = self._close[self.current_step]
+        if self.action_type == "discrete":
+            quantity = self._discrete_orders(np.asarray(action), price)
+        else:
+            quantity = self._weight_orders(np.asarray(action, dtype=np.float64), price)
+
+        # 所有股票一次成交：先收卖出所得，再付买入成本
+        sell = quantity < 0
+        self.balance += self.order_engine.sell_proceeds(-quantity[sell], price[sell]).sum()
+        self.balance -= self.order_engine.buy_cost(quantity[~sell], price[~sell]).sum()
+        self.holdings += quantity
+        fees = self.order_engine.fee(np.abs(quantity), price)
+
+        total_value = self.balance + float(self.holdings @ price)
+        reward = total_value - self.total_value
+        self.total_value = total_value
+
+        day = self.current_step
+        if self.current_step + self.rebalance_period > self._n_steps - 1:
+            self.done = True
+            day = self._n_steps - 1
+        else:
+            self.current_step += self.rebalance_period
+
+        info = {"total_asset": self.total_value, "day": day, "portfolio": self.holdings.copy(),
+                "traded_shares": quantity, "transaction_fee": float(fees.sum())}
+        return self._next_observation(), reward, self.done, info
+
+    def _discrete_orders(self, action, price):
+        """每只股票的买卖信号转换为成交数量：卖出清仓，余额按买入信号的个数平均分配。"""
+        quantity = np.where((action == 1) & (self.holdings > 0), -self.holdings, 0.0)
+        buy = action == 0
+        n_buy = np.count_nonzero(buy)
+        if n_buy:
+            # 卖出的收入当步即可用于买入
+            cash = self.balance + self.order_engine.sell_proceeds(-quantity, price).sum()
+            quantity[buy] = self.order_engine.buy_quantities(cash / n_buy, price[buy], self.holdings[buy])
+        return quantity
+
+    def _weight_orders(self, weights, price):
+        """目标权重转换为成交数量：先算目标持仓，卖出多余部分，买入部分在现金不足时按比例缩减。"""
+        weights = np.clip(weights, 0, None)
+        total = weights.sum()
+        if total <= 0:
+            weights = np.zeros_like(weights)
+            total = 1.0
+        asset_weights = weights[:self.n_assets] / total
+
+        # 目标持仓：不超过可投入资金和每只股票的持仓上限
+        valid = price > 0
+        budget = self.total_value * self.invest_ratio * asset_weights
+        with np.errstate(divide='ignore', invalid='ignore'):
+            target = np.where(valid, np.floor(budget / (price * (1 + self.fee_rate))), self.holdings)
+        target = np.minimum(target, self.max_stocks)
+        quantity = target - self.holdings
+
+        sell = quantity < 0
+        cash = self.balance + self.order_engine.sell_proceeds(-quantity[sell], price[sell]).sum()
+        buy = ~sell & (quantity > 0)
+        cost = self.order_engine.buy_cost(quantity[buy], price[buy]).sum()
+        if cost > cash:
+            # 现金不足时所有买单按同一比例缩减，向下取整保证总成本不超过现金
+            quantity[buy] = np.floor(quantity[buy] * max(cash, 0.0) / cost)
+        return quantity
+
+
+if __name__ == "__main__":
+    from DataGenerationAndManagementClass import DataGenerationAndManagementClass
+
+    generator = DataGenerationAndManagementClass()
+    frames = {symbol: generator.generate_stock_data_vectorized(symbol, "2020-01-01", "2020-12-31", seed=i)
+              for i, symbol in enumerate(["AAPL", "MSFT", "GOOG"])}
+    env = PortfolioEnv(frames, action_type="weights")
+    env.reset()
+    done = False
+    while not done:
+        obs, reward, done, info = env.step(env.action_space.sample())
+    print(f"Final total asset: {info['total_asset']:.2f}, holdings: {dict(zip(env.symbols, info['portfolio']))}")
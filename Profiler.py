@@ -0,0 +1,213 @@
+import json
+import time
+from array import array
+from collections import defaultdict
+from contextlib import contextmanager
+import numpy as np
+from stable_baselines3.common.callbacks import BaseCallback
+
+# 默认插桩的环境方法，环境中不存在的方法会被跳过
+ENV_METHODS = ("step", "reset", "_take_action", "_next_observation",
+               "step_wait", "_step_dqn", "_step_ppo", "_fill_observation")
+
+
+class Profiler:
+    """
+    可选的性能分析器：给环境方法加计时器，统计调用次数和耗时分布，并导出为JSON。
+
+    不调用 instrument 时环境不受任何影响；插桩只替换该环境实例上的方法，不修改类。
+    """
+
+    def __init__(self):
+        self.timings = defaultdict(lambda: array('d'))
+        self.counters = defaultdict(int)
+
+    def record(self, name, seconds):
+        """记录一次耗时（秒）。"""
+        self.timings[name].append(seconds)
+
+    def count(self, name, n=1):
+        """累加计数器。"""
+        self.counters[name] += n
+
+    @contextmanager
+    def timer(self, name):
+        """计时上下文，例如 with profiler.timer("predict"): ..."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def instrument(self, env, methods=ENV_METHODS, prefix=None):
+        """
+        给环境实例的方法加计时器。
+
+        参数:
+            env: DQNEnv、PPOEnv 或 VecTradingEnv 实例，需在交给模型之前插桩。
+            methods (tuple): 要计时的方法名。
+            prefix (str): 计时器名称前缀，默认为环境类名。
+
+        返回:
+            env: 同一个环境实例，便于链式调用。
+        """
+        prefix = prefix or type(env).__name__
+        for method_name in methods:
+            method = getattr(env, method_name, None)
+            if callable(method):
+                setattr(env, method_name, self._wrap(method, f"{prefix}.{method_name}"))
+        return env
+
+    def _wrap(self, method, name):
+        timings = self.timings[name]
+        perf_counter = time.perf_counter
+
+        def timed(*args, **kwargs):
+            start = perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                timings.append(perf_counter() - start)
+        return timed
+
+    def stats(self, name):
+        """某个计时器的次数、总耗时和分位数（秒）。"""
+        values = np.frombuffer(self.timings[name], dtype=np.float64)
+        if len(values) == 0:
+            return {"count": 0, "total": 0.0}
+        p50, p90, p99 = np.percentile(values, [50, 90, 99])
+        return {"count": int(len(values)), "total": float(values.sum()), "mean": float(values.mean()),
+                "p50": float(p50), "p90": float(p90), "p99": float(p99), "max": float(values.max())}
+
+    def histogram(self, name, bins=20):
+        """某个计时器的耗时直方图，区间按对数刻度划分。"""
+        values = np.frombuffer(self.timings[name], dtype=np.float64)
+        values = values[values > 0]
+        if len(values) == 0:
+            return {"edges": [], "counts": []}
+        low, high = np.log10(values.min()), np.log10(values.max())
+        counts, edges = np.histogram(values, bins=np.logspace(low, max(high, low + 1e-9), bins + 1))
+        return {"edges": edges.tolist(), "counts": counts.tolist()}
+
+    def report(self):
+        """所有计时器和计数器的汇总。"""
+        return {
+            "timers": {name: dict(self.stats(name), histogram=self.histogram(name)) for name in self.timings},
+            "counters": dict(self.counters),
+        }
+
+    def export(self, output_file, extra=None):
+        """
+        把汇总结果写入JSON文件，便于在多次运行之间比较。
+
+        参数:
+            output_file (str): 输出文件路径。
+            extra (dict): 额外写入的信息，例如运行参数。
+        """
+        report = self.report()
+        if extra:
+            report.update(extra)
+        with open(output_file, "w") as file:
+            json.dump(report, file, indent=2)
+        print(f"性能数据已保存到 {output_file}")
+        return report
+
+
+class ProfilingCallback(BaseCallback):
+    """
+    stable_baselines3 回调：统计环境步数/秒，以及采样（环境+策略推理）和策略更新各自的耗时。
+
+    采样阶段是 rollout 开始到结束之间的时间，其余时间（rollout 结束到下一次开始）是梯度更新。
+    如果环境用同一个 Profiler 插桩过，还会从采样时间中分出环境本身的耗时。
+    """
+
+    def __init__(self, profiler=None, output_file=None, verbose=0):
+        """
+        参数:
+            profiler (Profiler): 共享的分析器，默认新建一个。
+            output_file (str): 训练结束时导出JSON的路径，为None时不导出。
+            verbose (int): 大于0时训练结束后打印汇总。
+        """
+        super().__init__(verbose)
+        self.profiler = profiler or Profiler()
+        self.output_file = output_file
+        self._training_start = 0.0
+        self._rollout_start = None
+        self._update_start = None
+
+    def _on_training_start(self):
+        self._training_start = time.perf_counter()
+
+    def _on_rollout_start(self):
+        now = time.perf_counter()
+        if self._update_start is not None:
+            self.profiler.record("train.update", now - self._update_start)
+            self._update_start = None
+        self._rollout_start = now
+
+    def _on_step(self):
+        self.profiler.count("train.env_steps", self.training_env.num_envs)
+        return True
+
+    def _on_rollout_end(self):
+        now = time.perf_counter()
+        self.profiler.record("train.rollout", now - self._rollout_start)
+        self._update_start = now
+
+    def _on_training_end(self):
+        now = time.perf_counter()
+        if self._update_start is not None:
+            self.profiler.record("train.update", now - self._update_start)
+            self._update_start = None
+        summary = self.summary(now - self._training_start)
+        if self.verbose > 0:
+            for name, value in summary.items():
+                print(f"{name}: {value:.4f}" if isinstance(value, float) else f"{name}: {value}")
+        if self.output_file:
+            self.profiler.export(self.output_file, extra={"training": summary})
+
+    def summary(self, wall_time):
+        """训练过程的吞吐量和耗时划分（秒）。"""
+        rollout = self.profiler.stats("train.rollout")["total"]
+        update = self.profiler.stats("train.update")["total"]
+        # 环境耗时：每个插桩的环境只取最外层的 step 计时；VecEnv.step 内部会调用 step_wait，
+        # 只有没有 step 计时的环境才使用 step_wait，避免同一步被计算两次
+        timings = self.profiler.timings
+        env_time = sum(self.profiler.stats(name)["total"] for name in list(timings)
+                       if name.endswith(".step")
+                       or name.endswith(".step_wait") and not timings.get(name[:-len("_wait")]))
+        steps = self.profiler.counters["train.env_steps"]
+        return {
+            "wall_time": wall_time,
+            "env_steps": steps,
+            "env_steps_per_sec": steps / wall_time if wall_time > 0 else 0.0,
+            "rollout_time": rollout,
+            "env_time": env_time,
+            "policy_time": max(rollout - env_time, 0.0) if env_time else rollout,
+            "update_time": update,
+        }
+
+
+if __name__ == "__main__":
+    import argparse
+    from DataGenerationAndManagementClass import DataGenerationAndManagementClass
+    from InputHandler import InputHandler
+    from TrainingPipeline import TrainingPipeline
+
+    parser = argparse.ArgumentParser(description="分析一次训练中环境和策略更新的耗时")
+    parser.add_argument("--model", default="DQN", choices=["DQN", "PPO"])
+    parser.add_argument("--timesteps", type=int, default=20000)
+    parser.add_argument("--output", default="profile.json", help="JSON输出路径")
+    handler = InputHandler()
+    handler.add_portfolio_arguments(parser)
+    args = parser.parse_args()
+
+    data = DataGenerationAndManagementClass().generate_stock_data_vectorized("AAPL", "2020-01-01", "2022-12-31",
+                                                                            seed=0)
+    data = data.drop(columns=['Date', 'Index'])
+    parameters = handler.portfolio_parameters_from_args(args)
+    pipeline = TrainingPipeline(args.model, parameters, total_timesteps=args.timesteps, verbose=0)
+    profiler = Profiler()
+    env = profiler.instrument(pipeline.make_env(data))
+    model = pipeline.make_model(env)
+    model.learn(total_timesteps=args.timesteps, callback=ProfilingCallback(profiler, args.output, verbose=1))
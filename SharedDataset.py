@@ -0,0 +1,150 @@
+from multiprocessing import shared_memory
+import numpy as np
+from FileIOClass import COLUMNAR_ALIGNMENT, ColumnarDataset
+
+# 发布时不作为观测特征的列
+NON_FEATURE_COLUMNS = ('Date', 'Index', 'Symbol')
+
+
+class SharedDataset:
+    """
+    发布到共享内存中的数据集：所有列和一份预先转换好的float32特征矩阵放在同一块 multiprocessing.shared_memory 中。
+
+    主进程 publish 一次，子进程（例如 SubprocVecEnv 的工作进程）通过 attach 得到指向同一块内存的只读numpy视图，
+    不复制数据。对象本身被pickle时只传递共享内存的名称和各列的布局，因此可以直接放进环境构造函数的闭包里。
+    环境使用 feature_matrix=shared.features 时也不会再各自复制一份特征矩阵，每个工作进程的内存占用与数据大小无关。
+    spawn / forkserver 子进程中的行为和 unlink 见 EquivalenceChecks.check_shared_dataset。
+    """
+
+    def __init__(self, shm, layout, owner=False):
+        """
+        参数:
+            shm (SharedMemory): 共享内存块。
+            layout (dict): 各列的名称、类型、形状和偏移。
+            owner (bool): 是否为发布者，发布者负责释放共享内存。
+        """
+        self._shm = shm
+        self.layout = layout
+        self.owner = owner
+        self._arrays = {}
+        for name, dtype, shape, offset in layout["columns"]:
+            array = np.ndarray(tuple(shape), dtype=np.dtype(dtype), buffer=shm.buf, offset=offset)
+            array.flags.writeable = False
+            self._arrays[name] = array
+
+    @classmethod
+    def publish(cls, data, feature_columns=None, index_name="Date"):
+        """
+        把数据集复制到一块新的共享内存中。
+
+        参数:
+            data (pd.DataFrame or ColumnarDataset): 行情数据。
+            feature_columns (list): 组成特征矩阵的列，默认为除 Date、Index、Symbol 以外的全部列
+                                    （与 DQNEnv 去掉 Date、Index 后的观测列一致）。
+            index_name (str): 日期列的列名。
+
+        返回:
+            shared (SharedDataset): 发布者持有的数据集，用完后调用 unlink 释放。
+        """
+        arrays = {}
+        for name in data.columns:
+            array = np.asarray(data[name])
+            if array.dtype == object:
+                array = array.astype(str)
+            arrays[name] = np.ascontiguousarray(array)
+        if feature_columns is None:
+            feature_columns = [name for name in arrays if name not in NON_FEATURE_COLUMNS]
+        features = np.empty((len(data), len(feature_columns)), dtype=np.float32)
+        for i, name in enumerate(feature_columns):
+            features[:, i] = arrays[name]
+
+        columns = []
+        offset = 0
+        for name, array in list(arrays.items()) + [(None, features)]:
+            columns.append((name, array.dtype.str, array.shape, offset))
+            offset += -(-array.nbytes // COLUMNAR_ALIGNMENT) * COLUMNAR_ALIGNMENT
+        shm = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+        for (name, dtype, shape, start), array in zip(columns, list(arrays.values()) + [features]):
+            np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=start)[...] = array
+        layout = {"name": shm.name, "index_name": index_name, "feature_columns": list(feature_columns),
+                  "columns": columns}
+        return cls(shm, layout, owner=True)
+
+    @classmethod
+    def attach(cls, layout):
+        """在其他进程中按布局连接到已发布的共享内存。"""
+        return cls(shared_memory.SharedMemory(name=layout["name"]), layout)
+
+    def __reduce__(self):
+        # pickle时只传递布局，反序列化时直接连接到同一块共享内存
+        return SharedDataset.attach, (self.layout,)
+
+    @property
+    def features(self):
+        """只读的float32特征矩阵，可以直接传给 DQNEnv / PPOEnv 的 feature_matrix 参数。"""
+        return self._arrays[None]
+
+    def dataset(self):
+        """所有列组成的 ColumnarDataset（只读视图），可以直接传给环境。"""
+        return ColumnarDataset({name: array for name, array in self._arrays.items() if name is not None},
+                               self.layout["index_name"])
+
+    @property
+    def nbytes(self):
+        return self._shm.size
+
+    def close(self):
+        """断开当前进程与共享内存的连接，仍有环境引用其中的数组时保持连接。"""
+        self._arrays = {}
+        try:
+            self._shm.close()
+        except BufferError:
+            pass
+
+    def unlink(self):
+        """由发布者释放共享内存。"""
+        self.close()
+        if self.owner:
+            self._shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.unlink()
+
+
+class SharedEnvFactory:
+    """
+    SubprocVecEnv 的环境构造函数：在工作进程中连接共享数据集并创建环境，pickle时只包含共享内存的布局和环境参数。
+    """
+
+    def __init__(self, shared, env_class, **env_kwargs):
+        """
+        参数:
+            shared (SharedDataset): 已发布的数据集。
+            env_class: DQNEnv 或 PPOEnv。
+            env_kwargs: 传给环境的其余参数。
+        """
+        self.shared = shared
+        self.env_class = env_class
+        self.env_kwargs = env_kwargs
+
+    def __call__(self):
+        return self.env_class(self.shared.dataset(), feature_matrix=self.shared.features, **self.env_kwargs)
+
+
+def make_subproc_env(shared, env_class, n_envs, start_method=None, **env_kwargs):
+    """
+    创建使用共享数据集的 SubprocVecEnv。
+
+    参数:
+        shared (SharedDataset): 已发布的数据集。
+        env_class: DQNEnv 或 PPOEnv。
+        n_envs (int): 工作进程数。
+        start_method (str): 进程启动方式，默认由 stable_baselines3 决定。
+        env_kwargs: 传给环境的其余参数。
+    """
+    from stable_baselines3.common.vec_env import SubprocVecEnv
+    factory = SharedEnvFactory(shared, env_class, **env_kwargs)
+    return SubprocVecEnv([factory] * n_envs, start_method=start_method)
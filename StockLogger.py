@@ -1,16 +1,104 @@
+import sys
+import numpy as np
 import pandas as pd
+from Analytics import Analytics
+from DatasetRegistry import get_default_registry
+
+
+class TradeLogWriter:
+    """结构化交易日志写入器：按批向量化计算动作和数量，经缓冲区边算边写，不在内存中保留日志"""
+
+    def __init__(self, output_file, stock_name, initial_capital, dates=None, fmt="jsonl", echo=False,
+                 buffer_size=1 << 20):
+        """
+        output_file:输出文件路径
+        stock_name:股票名
+        initial_capital:初始资金
+        dates:日期序号到日期的数组，为None时日期列直接写序号
+        fmt:"jsonl"（每行一个JSON对象）或"csv"
+        echo:是否同时把日志打印到控制台
+        buffer_size:文件缓冲区字节数
+        """
+        if fmt not in ("jsonl", "csv"):
+            raise ValueError("日志格式必须是 'jsonl' 或 'csv'。")
+        self.stock_name = stock_name
+        self.initial_capital = initial_capital
+        self.dates = None if dates is None else np.asarray(dates).astype(str)
+        self.fmt = fmt
+        self.echo = echo
+        self.analytics = Analytics()
+        self.rows = 0
+        self._last_count = 0.0
+        self._file = open(output_file, mode='w', buffering=buffer_size)
+
+    def write(self, stock_price, stock_count, date_index, total_value):
+        """写入一批记录，持仓变化会与上一批的最后持仓衔接"""
+        stock_count = np.asarray(stock_count, dtype=np.float64)
+        date_index = np.asarray(date_index)
+        if len(stock_count) == 0:
+            return
+        stock_change = np.diff(stock_count, prepend=self._last_count)
+        self._last_count = stock_count[-1]
+
+        if self.dates is None:
+            dates = date_index
+        else:
+            known = (date_index >= 0) & (date_index < len(self.dates))
+            dates = np.where(known, self.dates[np.where(known, date_index, 0)], "未知日期")
+        batch = pd.DataFrame({
+            "date": dates,
+            "action": np.where(stock_change > 0, "Buy", np.where(stock_change < 0, "Sell", "Hold")),
+            "stock": self.stock_name,
+            "amount": np.abs(stock_change).astype(np.int64),
+            "price": np.round(np.asarray(stock_price, dtype=np.float64), 2),
+            "return": np.round(self.analytics.cumulative_return(total_value, self.initial_capital) * 100, 2),
+        })
+        if self.fmt == "csv":
+            text = batch.to_csv(header=(self.rows == 0), index=False)
+        else:
+            text = batch.to_json(orient="records", lines=True, force_ascii=False)
+            if not text.endswith("\n"):
+                text += "\n"
+        self._file.write(text)
+        if self.echo:
+            sys.stdout.write(text)
+        self.rows += len(batch)
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
 
 class StockLogger:
-    def __init__(self, stock_data_file):
+    def __init__(self, stock_data_file, registry=None):
+        """
+        stock_data_file:股票数据文件（CSV或列式数据文件）
+        registry:数据集注册表，默认使用进程内共享的注册表
+        """
         self.stock_data_file = stock_data_file
-        self.date_mapping = self.load_date_mapping()
+        self.registry = registry if registry is not None else get_default_registry()
+        self.dates = self.load_dates()
         self.log_entries = []
+        self.analytics = Analytics()
+
+    def load_dates(self):
+        """从数据集注册表取日期序列（只读），同一文件在一次运行中只解析一次，序号即数组下标"""
+        return self.registry.get(self.stock_data_file).dates
 
-    def load_date_mapping(self):
-        """从CSV文件中加载日期和序号的对应关系"""
-        data = pd.read_csv(self.stock_data_file)
-        mapping = dict(enumerate(data.iloc[:, 0]))
-        return mapping
+    def date_of(self, index):
+        """日期序号对应的日期字符串，超出范围时返回“未知日期”"""
+        if 0 <= index < len(self.dates):
+            return str(self.dates[index])
+        return "未知日期"
 
     def generate_log(self, stock_price, stock_count, date_index, total_value, initial_capital, stock_name):
         """根据输入数据生成日志
@@ -21,28 +109,50 @@ class StockLogger:
         initial_capital:初始资金
         stock_name:股票名
         """
-        # 获取具体日期
-        stock = 0
+        # 向量化计算每日持仓变化和收益率（百分比）
+        stock_changes = np.diff(np.asarray(stock_count, dtype=np.float64), prepend=0)
+        return_rates = self.analytics.cumulative_return(total_value, initial_capital) * 100
         for i in range(len(stock_price)):
-            stock_change = stock_count[i] - stock
-            stock = stock_count[i]
-            date = self.date_mapping.get(date_index[i], "未知日期")
+            stock_change = stock_changes[i]
+            date = self.date_of(date_index[i])
             action = "Buy" if stock_change > 0 else "Sell"
             if stock_change == 0:
                 action = "Hold"
-            return_rate = ((total_value[i] / initial_capital) - 1) * 100  # 收益率（百分比）
             log_entry = (
                 f"Date: {date}, "
                 f"Action: {action}, "
                 f"Stock: {stock_name}, "
-                f"Amount: {abs(stock_change)}, "
+                f"Amount: {int(abs(stock_change))}, "
                 f"Price: {round(stock_price[i], 2)}, "
-                f"Return: {round(return_rate, 2)}%"
+                f"Return: {round(return_rates[i], 2)}%"
             )
             print(log_entry)
             self.log_entries.append(log_entry)
         return 
 
+    def generate_summary(self, stock_price, stock_count, total_value, initial_capital):
+        """根据回测结果计算收益、回撤、夏普比率等指标并加入日志"""
+        metrics = self.analytics.summary(stock_price, total_value, stock_count, initial_capital)
+        for name, value in metrics.items():
+            log_entry = f"{name}: {value:.4f}"
+            print(log_entry)
+            self.log_entries.append(log_entry)
+        return metrics
+
+    def open_trade_log(self, output_file, initial_capital, stock_name, fmt="jsonl", echo=False):
+        """打开结构化交易日志写入器，日期使用本数据文件中的日期"""
+        return TradeLogWriter(output_file, stock_name, initial_capital, dates=self.dates, fmt=fmt, echo=echo)
+
+    def write_trade_log(self, stock_price, stock_count, date_index, total_value, initial_capital, stock_name,
+                        output_file, fmt="jsonl", echo=False, chunk_size=100000):
+        """generate_log 的结构化版本：分块写入文件而不是逐行打印和累积，适合很长的回测"""
+        with self.open_trade_log(output_file, initial_capital, stock_name, fmt=fmt, echo=echo) as writer:
+            for start in range(0, len(stock_price), chunk_size):
+                end = start + chunk_size
+                writer.write(stock_price[start:end], stock_count[start:end], date_index[start:end],
+                             total_value[start:end])
+        print(f"日志已保存到 {output_file}")
+
     def save_logs_to_file(self, output_file):
         """将日志列表保存到文本文件"""
         with open(output_file, mode='w') as file:
@@ -0,0 +1,181 @@
+import argparse
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+import pandas as pd
+from Analytics import Analytics
+from FileIOClass import FileIOClass
+from InputHandler import DEFAULT_PORTFOLIO_PARAMETERS, InputHandler
+
+# 未在搜索空间中出现的参数使用这些默认值，投资组合参数与其他命令行脚本相同
+DEFAULT_JOB = dict(model_choice="DQN", learning_rate=None, **DEFAULT_PORTFOLIO_PARAMETERS)
+
+
+def default_processes(threads_per_job=1):
+    """默认进程数：当前进程可用的CPU核数除以每个任务的线程数。"""
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count()
+    return max(1, cpus // threads_per_job)
+
+
+def init_worker(threads_per_job):
+    """进程池的子进程初始化函数：限制每个任务使用的线程数，避免多个torch进程争抢CPU。"""
+    for name in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        os.environ[name] = str(threads_per_job)
+    import torch
+    torch.set_num_threads(threads_per_job)
+
+
+def _run_job(job, train_file, test_file, total_timesteps, features=None):
+    """在子进程中完成一组参数的训练和回测，返回参数和回测指标。"""
+    from TrainingPipeline import TrainingPipeline
+
+    start = time.perf_counter()
+    file_io = FileIOClass()
+    train_data = file_io.open_columnar(train_file).drop(columns=['Date', 'Index'])
+    test_dataset = file_io.open_columnar(test_file)
+
+    parameters = {name: job[name] for name in
+                  ("initial_balance", "fee_rate", "invest_ratio", "rebalance_period", "max_stocks")}
+    pipeline = TrainingPipeline(job["model_choice"], parameters, learning_rate=job["learning_rate"],
+                                total_timesteps=total_timesteps, verbose=0, features=features)
+    model = pipeline.train(train_data)
+    result = pipeline.backtest(model, test_dataset.drop(columns=['Date', 'Index']))
+
+    prices = test_dataset['Close'][result['days']]
+    metrics = Analytics().summary(prices, result['total_asset'], result['portfolios'], parameters['initial_balance'])
+    return dict(job, **metrics, seconds=time.perf_counter() - start)
+
+
+class SweepRunner:
+    """
+    超参数搜索：把每组参数的训练+回测作为独立任务放到进程池中并行运行，并把最终收益和各项指标汇总成一张表。
+    """
+
+    def __init__(self, train_file, test_file, total_timesteps=50000, processes=None, threads_per_job=1,
+                 features=None):
+        """
+        参数:
+            train_file (str): 训练数据的列式数据文件（FileIOClass.write_columnar 写出）。
+            test_file (str): 测试数据的列式数据文件。
+            total_timesteps (int): 每个任务的训练步数。
+            processes (int): 进程数，默认为可用CPU核数除以每个任务的线程数。
+            threads_per_job (int): 每个任务中torch可使用的线程数。
+            features (dict): FeatureStore 的特征配置，指定时特征矩阵只计算一次，所有子进程以内存映射方式共享。
+        """
+        if processes is None:
+            processes = default_processes(threads_per_job)
+        self.train_file = train_file
+        self.test_file = test_file
+        self.total_timesteps = total_timesteps
+        self.processes = processes
+        self.threads_per_job = threads_per_job
+        self.features = features
+        self.handler = InputHandler()
+
+    def grid(self, space):
+        """
+        网格搜索：space 为 {参数名: 候选值列表}，返回所有组合。
+        """
+        names = list(space)
+        return [self._make_job(dict(zip(names, values))) for values in itertools.product(*space.values())]
+
+    def random_search(self, space, n_samples, seed=None):
+        """
+        随机搜索：space 中的值为列表时从中随机选择；为 (low, high) 元组时在区间内均匀采样，
+        learning_rate 在对数尺度上采样，rebalance_period 和 max_stocks 取整数。
+        """
+        rng = np.random.default_rng(seed)
+        jobs = []
+        for _ in range(n_samples):
+            job = {}
+            for name, values in space.items():
+                if isinstance(values, tuple):
+                    low, high = values
+                    if name == "learning_rate":
+                        job[name] = float(np.exp(rng.uniform(np.log(low), np.log(high))))
+                    elif name in ("rebalance_period", "max_stocks"):
+                        job[name] = int(rng.integers(low, high, endpoint=True))
+                    else:
+                        job[name] = float(rng.uniform(low, high))
+                else:
+                    job[name] = values[rng.integers(len(values))]
+            jobs.append(self._make_job(job))
+        return jobs
+
+    def _make_job(self, overrides):
+        """补全默认参数，并复用 InputHandler 的校验规则。"""
+        job = dict(DEFAULT_JOB, **overrides)
+        self.handler.validate_model_choice(job["model_choice"])
+        job.update(self.handler.validate_portfolio_parameters(job))
+        return job
+
+    def run(self, jobs, output_file=None):
+        """
+        并行运行所有任务。
+
+        参数:
+            jobs (list): grid 或 random_search 生成的参数列表。
+            output_file (str): 指定时把结果表保存为CSV文件。
+
+        返回:
+            results (pd.DataFrame): 每行一个任务，包含参数、回测指标和耗时，按最终收益从高到低排序；失败的任务记录在error列。
+        """
+        rows = []
+        with ProcessPoolExecutor(max_workers=self.processes, initializer=init_worker,
+                                 initargs=(self.threads_per_job,)) as executor:
+            futures = {executor.submit(_run_job, job, self.train_file, self.test_file, self.total_timesteps,
+                                       self.features): job
+                       for job in jobs}
+            for future in as_completed(futures):
+                try:
+                    rows.append(future.result())
+                except Exception as e:
+                    rows.append(dict(futures[future], error=repr(e)))
+                print(f"已完成 {len(rows)}/{len(jobs)} 个任务")
+
+        results = pd.DataFrame(rows)
+        if "final_profit" in results:
+            results = results.sort_values("final_profit", ascending=False, ignore_index=True)
+        if output_file:
+            results.to_csv(output_file, index=False)
+        return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="并行超参数搜索")
+    parser.add_argument("spec", help="搜索配置JSON文件，格式见下方示例")
+    parser.add_argument("--output", default="sweep_results.csv", help="结果表保存路径")
+    parser.add_argument("--processes", type=int, default=None, help="进程数，默认按CPU核数")
+    parser.add_argument("--threads-per-job", type=int, default=1, help="每个任务的torch线程数")
+    args = parser.parse_args()
+
+    # 配置示例：
+    # {"train": {"stock_symbol": "AAPL", "start_date": "2020-01-01", "end_date": "2022-12-31", "seed": 1},
+    #  "test": {"stock_symbol": "AAPL", "start_date": "2023-01-01", "end_date": "2023-12-31", "seed": 2},
+    #  "total_timesteps": 50000, "mode": "grid", "features": {},
+    #  "space": {"model_choice": ["DQN", "PPO"], "fee_rate": [0, 0.001], "learning_rate": [0.0001, 0.0003]}}
+    # mode 为 "random" 时还需要 "n_samples"，space 中可以用 [low, high] 区间（写在 "ranges" 中）。
+    with open(args.spec) as file:
+        spec = json.load(file)
+
+    from DataGenerationAndManagementClass import DataGenerationAndManagementClass
+    data_generator = DataGenerationAndManagementClass()
+    file_io = FileIOClass()
+    for name in ("train", "test"):
+        data = data_generator.generate_stock_data_vectorized(**spec[name])
+        file_io.write_columnar(data, f"sweep_{name}_data.stk")
+
+    runner = SweepRunner("sweep_train_data.stk", "sweep_test_data.stk",
+                         total_timesteps=spec.get("total_timesteps", 50000),
+                         processes=args.processes, threads_per_job=args.threads_per_job,
+                         features=spec.get("features"))
+    if spec.get("mode", "grid") == "grid":
+        jobs = runner.grid(spec["space"])
+    else:
+        space = dict(spec.get("space", {}), **{name: tuple(bounds) for name, bounds in spec.get("ranges", {}).items()})
+        jobs = runner.random_search(space, spec["n_samples"], seed=spec.get("seed"))
+    results = runner.run(jobs, output_file=args.output)
+    print(results)
@@ -0,0 +1,232 @@
+import numpy as np
+from stable_baselines3 import DQN
+from stable_baselines3 import PPO
+from stable_baselines3.common.callbacks import CheckpointCallback
+from DQNEnv import DQNEnv
+from FeatureStore import FeatureStore
+from ObservationBuilder import ObservationBuilder
+from PPOEnv import PPOEnv
+
+class TrainingPipeline:
+    """封装 main.py 中的建环境、训练和回测流程，便于脚本和批量实验重复使用。"""
+
+    def __init__(self, model_choice, parameters, learning_rate=None, total_timesteps=50000, verbose=1,
+                 indicators=None, features=None, feature_store=None, model_cache=None, checkpoint_freq=0):
+        """
+        参数:
+            model_choice (str): "DQN" 或 "PPO"。
+            parameters (dict): 投资组合参数，格式与 InputHandler.get_portfolio_parameters 的返回值相同。
+            learning_rate (float): 学习率，默认使用各模型在 main.py 中的设置。
+            total_timesteps (int): 训练步数。
+            verbose (int): stable_baselines3 的日志级别。
+            indicators (dict): ObservationBuilder 的参数，指定时观测中加入滚动技术指标，{} 表示使用默认指标。
+            features (dict): FeatureStore 的特征配置，指定时环境从预先计算的特征矩阵中切出观测，{} 表示使用默认配置。
+            feature_store (FeatureStore): 特征缓存，默认保存在 feature_store 目录。
+            model_cache (ModelCache): 模型缓存，指定时相同配置和数据的模型只训练一次，并支持中断后从检查点继续。
+            checkpoint_freq (int): 每训练多少步保存一次检查点，0表示不保存；需要同时指定 model_cache。
+        """
+        if model_choice not in ("DQN", "PPO"):
+            raise ValueError("模型必须是 'DQN' 或 'PPO'。")
+        self.model_choice = model_choice
+        self.parameters = parameters
+        self.learning_rate = learning_rate
+        self.total_timesteps = total_timesteps
+        self.verbose = verbose
+        self.indicators = indicators
+        self.features = features
+        self.feature_store = feature_store or FeatureStore()
+        self.model_cache = model_cache
+        self.checkpoint_freq = checkpoint_freq
+        self.model_class = DQN if model_choice == 'DQN' else PPO
+
+    def make_env(self, data):
+        """用投资组合参数创建对应模型的交易环境。"""
+        env_class = DQNEnv if self.model_choice == 'DQN' else PPOEnv
+        # 指标状态属于单个环境，每个环境创建自己的 ObservationBuilder
+        builder = ObservationBuilder(**self.indicators) if self.indicators is not None else None
+        feature_matrix, feature_bounds = None, None
+        if self.features is not None:
+            feature_matrix = self.feature_store.get(data, self.features)
+            feature_bounds = self.feature_store.bounds(self.features)
+        return env_class(data, initial_balance=self.parameters['initial_balance'], fee_rate=self.parameters['fee_rate'],
+                         invest_ratio=self.parameters['invest_ratio'],
+                         rebalance_period=self.parameters['rebalance_period'],
+                         max_stocks=self.parameters['max_stocks'], observation_builder=builder,
+                         feature_matrix=feature_matrix, feature_bounds=feature_bounds)
+
+    def model_kwargs(self):
+        """创建模型时使用的超参数。"""
+        if self.model_choice == 'DQN':
+            return {'policy_kwargs': {'net_arch': [64, 32, 10]},
+                    'learning_rate': self.learning_rate or 0.0001,
+                    'exploration_fraction': 0.3,
+                    'exploration_initial_eps': 0.8,
+                    'exploration_final_eps': 0.1}
+        return {'learning_rate': self.learning_rate} if self.learning_rate else {}
+
+    def hyperparameters(self):
+        """影响训练结果的全部设置（模型超参数、训练步数和观测配置），作为模型缓存键的一部分。"""
+        return {"model_kwargs": self.model_kwargs(), "total_timesteps": self.total_timesteps,
+                "indicators": self.indicators, "features": self.features}
+
+    def make_model(self, env):
+        """创建未训练的模型。"""
+        return self.model_class("MlpPolicy", env, verbose=self.verbose, **self.model_kwargs())
+
+    def cache_key(self, train_data):
+        """训练数据和当前配置对应的模型缓存键。"""
+        return self.model_cache.key(self.model_choice, self.hyperparameters(), self.parameters,
+                                    self.model_cache.data_hash(train_data))
+
+    def train(self, train_data, callback=None):
+        """
+        在训练数据上训练模型并返回，callback 会传给 model.learn（例如 Profiler.ProfilingCallback）。
+
+        指定了 model_cache 时：已有相同配置的模型则直接加载；有未完成的检查点则从检查点继续训练；训练完成后保存到缓存。
+        """
+        env = self.make_env(train_data)
+        if self.model_cache is None:
+            model = self.make_model(env)
+            model.learn(total_timesteps=self.total_timesteps, callback=callback)
+            return model
+
+        key = self.cache_key(train_data)
+        model = self.model_cache.load(key, self.model_class, env=env)
+        if model is not None:
+            print(f"使用缓存的模型 {self.model_cache.model_path(key)}")
+            return model
+        return self._learn(key, env, self.total_timesteps, callback,
+                           metadata=dict(self.hyperparameters(), model_choice=self.model_choice,
+                                         parameters=self.parameters))
+
+    def fine_tune(self, base_data, new_data, total_timesteps=None, callback=None):
+        """
+        在 base_data 上训练（或从缓存加载）的模型基础上，用追加的数据继续训练。
+
+        参数:
+            base_data: 原训练数据，用于找到缓存的基础模型。
+            new_data: 追加后的数据（或只有新增部分）。
+            total_timesteps (int): 继续训练的步数，默认与 total_timesteps 相同。
+
+        返回:
+            model: 继续训练后的模型；指定了 model_cache 时结果同样会被缓存。
+        """
+        total_timesteps = total_timesteps or self.total_timesteps
+        env = self.make_env(new_data)
+        if self.model_cache is None:
+            model = self.train(base_data)
+            model.set_env(env)
+            model.learn(total_timesteps=total_timesteps, callback=callback, reset_num_timesteps=False)
+            return model
+
+        base_key = self.cache_key(base_data)
+        key = self.model_cache.key(self.model_choice, {"base_model": base_key, "fine_tune_timesteps": total_timesteps},
+                                   self.parameters, self.model_cache.data_hash(new_data))
+        model = self.model_cache.load(key, self.model_class, env=env)
+        if model is not None:
+            print(f"使用缓存的模型 {self.model_cache.model_path(key)}")
+            return model
+        base_model = self.train(base_data)
+        return self._learn(key, env, base_model.num_timesteps + total_timesteps, callback, base_model=base_model,
+                           metadata=dict(self.hyperparameters(), model_choice=self.model_choice,
+                                         parameters=self.parameters, base_model=base_key,
+                                         fine_tune_timesteps=total_timesteps))
+
+    def _learn(self, key, env, target_timesteps, callback=None, base_model=None, metadata=None):
+        """训练到 num_timesteps 达到 target_timesteps，有检查点时从最近的检查点继续，完成后存入缓存。"""
+        checkpoint = self.model_cache.latest_checkpoint(key)
+        if checkpoint is not None:
+            model_path, buffer_path, _ = checkpoint
+            print(f"从检查点 {model_path} 继续训练")
+            model = self.model_class.load(model_path, env=env)
+            if buffer_path is not None:
+                model.load_replay_buffer(buffer_path)
+            reset_num_timesteps = False
+        elif base_model is not None:
+            model = base_model
+            model.set_env(env)
+            reset_num_timesteps = False
+        else:
+            model = self.make_model(env)
+            reset_num_timesteps = True
+
+        callbacks = []
+        if self.checkpoint_freq:
+            callbacks.append(CheckpointCallback(save_freq=self.checkpoint_freq,
+                                                save_path=self.model_cache.checkpoint_dir(key),
+                                                name_prefix="checkpoint", save_replay_buffer=True))
+        if callback is not None:
+            callbacks.append(callback)
+        remaining = target_timesteps - (0 if reset_num_timesteps else model.num_timesteps)
+        if remaining > 0:
+            model.learn(total_timesteps=remaining, callback=callbacks, reset_num_timesteps=reset_num_timesteps)
+        self.model_cache.save(model, key, metadata)
+        return model
+
+    def backtest(self, model, test_data, daily=False):
+        """
+        在测试数据上运行训练好的智能体，model 只需要提供 predict（stable_baselines3 模型或 PolicyExport.NumpyPolicy）。
+
+        参数:
+            daily (bool): rebalance_period 大于1时，是否用环境的 equity_curve 把调仓日的记录展开为逐日记录。
+
+        返回:
+            result (dict): days（交易日序号）、total_asset（每次交易后的总资产）、portfolios（每次交易后的持仓）三个numpy数组。
+        """
+        test_env = self.make_env(test_data)
+        obs = test_env.reset()
+        done = False
+        days = []
+        total_asset = []
+        portfolios = []
+        while not done:
+            action = model.predict(obs, deterministic=True)[0]
+            obs, reward, done, info = test_env.step(action)
+            days.append(info['day'])
+            total_asset.append(info['total_asset'])
+            portfolios.append(info['portfolio'])
+        if daily:
+            return test_env.equity_curve(total_asset, portfolios)
+        return {"days": np.array(days), "total_asset": np.array(total_asset), "portfolios": np.array(portfolios)}
+
+    def backtest_batch(self, model, datasets, daily=False):
+        """
+        同时回测多份互相独立的测试数据（不同股票或不同时间段，长度可以不同）。
+
+        每一步把所有未结束回合的观测堆叠成一个批次，只调用一次 model.predict，再逐个推进各自的环境；
+        每个回合的结果与单独调用 backtest 相同。
+
+        参数:
+            model: 训练好的模型，或 PolicyExport.NumpyPolicy。
+            datasets (list or dict): 测试数据的列表，或 {名称: 测试数据}。
+            daily (bool): 与 backtest 相同，把调仓日的记录展开为逐日记录。
+
+        返回:
+            results (list or dict): 与 datasets 一一对应，每个元素与 backtest 的返回值格式相同。
+        """
+        names = list(datasets) if isinstance(datasets, dict) else None
+        envs = [self.make_env(data) for data in (datasets.values() if names is not None else datasets)]
+        # 所有回合的当前观测放在一个预先分配的矩阵中，每步只取出未结束的行
+        obs = np.stack([env.reset() for env in envs])
+        records = [([], [], []) for _ in envs]
+        active = np.arange(len(envs))
+        while len(active):
+            actions = model.predict(obs[active], deterministic=True)[0]
+            running = []
+            for i, action in zip(active, actions):
+                obs[i], reward, done, info = envs[i].step(action)
+                days, total_asset, portfolios = records[i]
+                days.append(info['day'])
+                total_asset.append(info['total_asset'])
+                portfolios.append(info['portfolio'])
+                if not done:
+                    running.append(i)
+            active = np.array(running, dtype=np.int64)
+
+        if daily:
+            results = [env.equity_curve(total_asset, portfolios)
+                       for env, (_, total_asset, portfolios) in zip(envs, records)]
+        else:
+            results = [{"days": np.array(days), "total_asset": np.array(total_asset),
+                        "portfolios": np.array(portfolios)} for days, total_asset, portfolios in records]
+        return dict(zip(names, results)) if names is not None else results
@@ -0,0 +1,194 @@
+import numpy as np
+import stable_baselines3
+from stable_baselines3.common.vec_env import VecEnv
+# VecEnv 不经过 stable_baselines3 的环境转换，空间类型必须与其版本一致：2.x 使用 gymnasium，1.x 使用 gym
+if int(stable_baselines3.__version__.split(".")[0]) >= 2:
+    from gymnasium import spaces
+else:
+    from gym import spaces
+from PPOEnv import PPOEnv
+from OrderExecution import OrderExecutionEngine
+
+class VecTradingEnv(VecEnv):
+    """
+    批量交易环境：用NumPy数组同时推进N个交易回合，可直接作为stable_baselines3的VecEnv使用。
+
+    env_type="DQN" 时每个子环境的行为与 DQNEnv 一致（手续费计入买入成本、不交易惩罚），
+    env_type="PPO" 时与 PPOEnv 一致（按 invest_ratio 投入资金、max_stocks 限制持仓、交易奖励）。
+    两种语义都按 rebalance_period 跳过调仓日之间的交易日。
+    买卖的成交计算与单个环境一样由 OrderExecutionEngine 完成，只是一次处理所有回合。
+    """
+
+    # 每个回合一个元素的状态数组，get_attr / set_attr 按子环境取值和赋值
+    STATE_ATTRS = ("current_step", "balance", "portfolio", "total_value")
+
+    def __init__(self, data, num_envs=64, env_type="DQN", initial_balance=10000, fee_rate=0, invest_ratio=1.0,
+                 rebalance_period=1, max_stocks=float('inf')):
+        """
+        参数:
+            data (pd.DataFrame or list): 单个行情DataFrame，或者多个列相同、长度相同的DataFrame（按子环境轮流分配）。
+            num_envs (int): 并行的回合数量。
+            env_type (str): "DQN" 或 "PPO"，决定交易与奖励的语义。
+            其余参数与 DQNEnv / PPOEnv 相同。
+        """
+        if env_type not in ("DQN", "PPO"):
+            raise ValueError("env_type 必须是 'DQN' 或 'PPO'。")
+        frames = list(data) if isinstance(data, (list, tuple)) else [data]
+        if len({len(df) for df in frames}) != 1:
+            raise ValueError("所有行情数据的长度必须相同。")
+
+        self.env_type = env_type
+        self.initial_balance = initial_balance
+        self.fee_rate = fee_rate  # 手续费率
+        self.invest_ratio = invest_ratio  # 每次买入投入的资金比例（PPO语义）
+        self.rebalance_period = rebalance_period  # 调仓周期，两次调仓之间的交易日被跳过
+        self.max_stocks = max_stocks  # 最多持有股票数量
+        self.render_mode = None
+        # 与单个环境使用同一套成交逻辑：DQN语义每次买入使用全部余额，PPO语义按投资比例买入
+        self.order_engine = OrderExecutionEngine(fee_rate=fee_rate,
+                                                 invest_ratio=1.0 if env_type == "DQN" else invest_ratio,
+                                                 max_stocks=max_stocks)
+
+        # 行情数据统一转换为 (品种, 天数, 特征) 的float32张量和 (品种, 天数) 的float64收盘价
+        columns = list(frames[0].columns) if env_type == "DQN" else PPOEnv.OBS_COLUMNS
+        self._features = np.ascontiguousarray(np.stack([df[columns].to_numpy(dtype=np.float32) for df in frames]))
+        self._close = np.ascontiguousarray(np.stack([np.asarray(df["Close"], dtype=np.float64) for df in frames]))
+        # 收盘价前缀和，PPO语义下用于一次算出跳过的交易日的持仓市值之和
+        self._close_cumsum = np.concatenate((np.zeros((len(frames), 1)), np.cumsum(self._close, axis=1)), axis=1)
+        self._n_steps = self._features.shape[1]
+        self._n_features = self._features.shape[2]
+        self._symbol = np.arange(num_envs) % len(frames)
+
+        # 各回合的状态
+        self.current_step = np.zeros(num_envs, dtype=np.int64)
+        self.balance = np.full(num_envs, float(initial_balance))
+        self.portfolio = np.zeros(num_envs)
+        self.total_value = np.full(num_envs, float(initial_balance))
+
+        extra = 2 if env_type == "DQN" else 1
+        self._obs = np.zeros((num_envs, self._n_features + extra), dtype=np.float32)
+        observation_space = spaces.Box(low=0, high=np.inf, shape=(self._n_features + extra,))
+        action_space = spaces.Discrete(3)
+        self._actions = np.zeros(num_envs, dtype=np.int64)
+        super(VecTradingEnv, self).__init__(num_envs, observation_space, action_space)
+
+    def _reset_envs(self, mask):
+        self.current_step[mask] = 0
+        self.balance[mask] = self.initial_balance
+        self.portfolio[mask] = 0
+        self.total_value[mask] = self.initial_balance
+
+    def _fill_observation(self):
+        obs = self._obs
+        obs[:, :self._n_features] = self._features[self._symbol, self.current_step]
+        obs[:, self._n_features] = self.balance
+        if self.env_type == "DQN":
+            obs[:, self._n_features + 1] = self.portfolio
+        return obs
+
+    def reset(self):
+        self._reset_envs(np.ones(self.num_envs, dtype=bool))
+        return self._fill_observation().copy()
+
+    def step_async(self, actions):
+        self._actions = np.asarray(actions, dtype=np.int64).reshape(self.num_envs)
+
+    def step_wait(self):
+        if self.env_type == "DQN":
+            rewards, dones, infos = self._step_dqn(self._actions)
+        else:
+            rewards, dones, infos = self._step_ppo(self._actions)
+
+        # 结束的回合记录终止观测后自动重置，与DummyVecEnv的行为一致
+        obs = self._fill_observation()
+        if dones.any():
+            for i in np.flatnonzero(dones):
+                infos[i]["terminal_observation"] = obs[i].copy()
+            self._reset_envs(dones)
+            obs = self._fill_observation()
+        return obs.copy(), rewards.astype(np.float32), dones, infos
+
+    def _step_dqn(self, actions):
+        price = self._close[self._symbol, self.current_step]
+        last_balance = self.balance
+        last_portfolio = self.portfolio
+        self.balance, self.portfolio, _, _ = self.order_engine.execute(actions, self.balance, self.portfolio, price)
+
+        # 奖励基于资产增长，并惩罚不交易
+        total_value = self.balance + self.portfolio * price
+        rewards = total_value - self.total_value
+        self.total_value = total_value
+        no_trade = (last_balance == self.balance) | (last_portfolio == self.portfolio)
+        rewards -= np.where(no_trade, self.initial_balance / 100, 0)
+
+        dones = self.current_step + self.rebalance_period > self._n_steps - 1
+        days = np.where(dones, self._n_steps - 1, self.current_step)
+        self.current_step[~dones] += self.rebalance_period
+        infos = [{"total_asset": self.total_value[i], "day": days[i], "portfolio": self.portfolio[i]}
+                 for i in range(self.num_envs)]
+        return rewards, dones, infos
+
+    def _step_ppo(self, actions):
+        price = self._close[self._symbol, self.current_step]
+
+        self.balance, self.portfolio, quantity, transaction_fee = self.order_engine.execute(
+            actions, self.balance, self.portfolio, price)
+        traded = quantity != 0
+        bought_shares = np.maximum(quantity, 0)
+
+        self.total_value = self.balance + self.portfolio * price
+        days = self.current_step.copy()
+        self.current_step = np.minimum(days + self.rebalance_period, self._n_steps - 1)
+        dones = self.current_step >= self._n_steps - 1
+        rewards = self.total_value - self.initial_balance
+        if self.rebalance_period > 1:
+            # 与 PPOEnv 相同：持有多天时奖励为持有期内每天奖励之和；所有回合共用一份收盘价前缀和，
+            # 持仓市值相减即得，不必逐个回合对收盘价切片求和
+            held_days = self.current_step - days
+            held_value = self.portfolio * (self._close_cumsum[self._symbol, self.current_step]
+                                           - self._close_cumsum[self._symbol, days])
+            rewards = np.where(held_days == 1, rewards, held_days * (self.balance - self.initial_balance) + held_value)
+        rewards = rewards + np.where(traded, 500, 0)
+
+        infos = [{"total_asset": self.total_value[i], "day": days[i], "portfolio": self.portfolio[i],
+                  "bought_shares": bought_shares[i], "transaction_fee": transaction_fee[i]}
+                 for i in range(self.num_envs)]
+        return rewards, dones, infos
+
+    def close(self):
+        pass
+
+    def seed(self, seed=None):
+        # 环境本身是确定性的，没有需要设置的随机数种子
+        return [None] * self.num_envs
+
+    def get_attr(self, attr_name, indices=None):
+        indices = self._get_indices(indices)
+        value = getattr(self, attr_name)
+        if attr_name in self.STATE_ATTRS:
+            return [value[i] for i in indices]
+        return [value] * len(indices)
+
+    def set_attr(self, attr_name, value, indices=None):
+        if attr_name in self.STATE_ATTRS:
+            getattr(self, attr_name)[list(self._get_indices(indices))] = value
+        else:
+            setattr(self, attr_name, value)
+
+    def env_method(self, method_name, *method_args, indices=None, **method_kwargs):
+        """
+        子环境共享同一组数组，方法都在 VecTradingEnv 上执行：
+        reset 只重置 indices 指定的回合并返回它们各自的观测；其他方法执行一次，结果分给每个指定的子环境。
+        """
+        indices = list(self._get_indices(indices))
+        if method_name == "reset":
+            mask = np.zeros(self.num_envs, dtype=bool)
+            mask[indices] = True
+            self._reset_envs(mask)
+            obs = self._fill_observation()
+            return [obs[i].copy() for i in indices]
+        result = getattr(self, method_name)(*method_args, **method_kwargs)
+        return [result] * len(indices)
+
+    def env_is_wrapped(self, wrapper_class, indices=None):
+        return [False] * len(self._get_indices(indices))
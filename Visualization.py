@@ -1,23 +1,26 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
 import matplotlib.pyplot as plt
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from Analytics import Analytics
+
+
+def _render_run(run, output_dir, max_points, dpi):
+    """子进程中渲染一次回测结果，返回图片路径。"""
+    output_file = os.path.join(output_dir, f"{run.get('name', 'run')}.png")
+    Visualizer().render(run['prices'], run['total_asset'], run['days'], run['initial_balance'],
+                        output_file=output_file, max_points=max_points, dpi=dpi)
+    return output_file
+
 
 class Visualizer():
     def __init__(self):
-        pass
+        self.analytics = Analytics()
 
     def _maxProfit(self, prices, balance):
-        ans = [0]
-        left = 0
-        right = 1
-        while right < len(prices):
-            if prices[right] > prices[left]:
-                ans.append(prices[right] - prices[right-1] + ans[-1])   
-            else:
-                ans.append(ans[-1])
-            left += 1
-            right += 1
-        for i in range(len(ans)):
-            ans[i] = ans[i] * balance
-        return ans
+        return self.analytics.max_profit_curve(prices, balance)
 
     # def _avgProfit(self, prices, balance):
     #     ans = [0]
@@ -33,23 +36,106 @@ class Visualizer():
         
     #     return ans
     
-    def visualize(self, prices, total_asset, days, initial_balance, show=False):
-        profit_rate = [x / initial_balance - 1 for x in total_asset]
-        market_trend = [x / prices[0] - 1 for x in prices]
+    def downsample(self, x, y, max_points):
+        """
+        LTTB（Largest-Triangle-Three-Buckets）降采样：保留首尾点，其余点分桶后在每个桶中选出
+        与上一个选中点、下一个桶均值构成最大三角形面积的点，能保留曲线的峰谷形状。
+
+        参数:
+            x (array-like): 横坐标。
+            y (array-like): 纵坐标。
+            max_points (int): 最多保留的点数，为None或不少于原点数时不降采样。
+
+        返回:
+            x, y (np.ndarray): 降采样后的坐标。
+        """
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        n = len(x)
+        if max_points is None or max_points >= n or max_points < 3:
+            return x, y
+        # 中间的 n-2 个点分成 max_points-2 个桶，最后一个"桶"是末尾点；各桶的均值与选点无关，一次算出
+        edges = np.append(np.linspace(1, n - 1, max_points - 1).astype(np.int64), n)
+        sizes = np.diff(edges)
+        mean_x = np.add.reduceat(x, edges[:-1]) / sizes
+        mean_y = np.add.reduceat(y, edges[:-1]) / sizes
+        selected = np.empty(max_points, dtype=np.int64)
+        selected[0] = 0
+        selected[-1] = n - 1
+        a = 0
+        for i in range(max_points - 2):
+            start, end = edges[i], edges[i + 1]
+            next_x, next_y = mean_x[i + 1], mean_y[i + 1]
+            area = np.abs((x[a] - next_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (next_y - y[a]))
+            a = start + area.argmax()
+            selected[i + 1] = a
+        return x[selected], y[selected]
+
+    def _draw(self, fig, prices, total_asset, days, initial_balance, max_points=None):
+        profit_rate = self.analytics.cumulative_return(total_asset, initial_balance)
+        market_trend = self.analytics.market_trend(prices)
+        ax = fig.add_subplot()
         # 创建折线图
-        plt.plot(days, profit_rate, label='profit rate')
-        # plt.plot([i for i in range(days)], _maxProfit(prices, 10000), label='max profit')
-        plt.plot(days, market_trend, label='market trend')
-        plt.grid(True)
+        ax.plot(*self.downsample(days, profit_rate, max_points), label='profit rate')
+        # ax.plot([i for i in range(days)], _maxProfit(prices, 10000), label='max profit')
+        ax.plot(*self.downsample(days, market_trend, max_points), label='market trend')
+        ax.grid(True)
 
         # 添加标题
-        plt.title("Profit rate")
+        ax.set_title("Profit rate")
 
         # 添加X轴和Y轴标签
-        plt.xlabel("Days")
-        plt.ylabel("Profit rate")
-        
-        plt.legend()
-        plt.savefig("profit_rate.png", dpi=300, bbox_inches='tight')
-        if show:
-            plt.show()
\ No newline at end of file
+        ax.set_xlabel("Days")
+        ax.set_ylabel("Profit rate")
+
+        ax.legend()
+
+    def visualize(self, prices, total_asset, days, initial_balance, show=False, output_file="profit_rate.png",
+                  max_points=None, dpi=300):
+        """绘制收益率和市场走势并保存图片；每次调用使用新的图，不会与上一次的曲线叠加"""
+        if not show:
+            return self.render(prices, total_asset, days, initial_balance, output_file=output_file,
+                               max_points=max_points, dpi=dpi)
+        fig = plt.figure()
+        self._draw(fig, prices, total_asset, days, initial_balance, max_points=max_points)
+        fig.savefig(output_file, dpi=dpi, bbox_inches='tight')
+        plt.show()
+        plt.close(fig)
+        return output_file
+
+    def render(self, prices, total_asset, days, initial_balance, output_file="profit_rate.png", max_points=2000,
+               dpi=100):
+        """
+        无界面渲染：直接创建 Figure 并用 Agg 画布保存，不经过 pyplot 的全局状态，适合批量出图。
+
+        参数:
+            max_points (int): 每条曲线最多绘制的点数，超过时用 LTTB 降采样。
+            dpi (int): 图片分辨率。
+
+        返回:
+            output_file (str): 图片路径。
+        """
+        fig = Figure()
+        FigureCanvasAgg(fig)
+        self._draw(fig, prices, total_asset, days, initial_balance, max_points=max_points)
+        # 使用默认边距，省去 bbox_inches='tight' 需要的额外一次绘制
+        fig.savefig(output_file, dpi=dpi)
+        return output_file
+
+    def render_batch(self, runs, output_dir="charts", processes=None, max_points=2000, dpi=100):
+        """
+        在进程池中批量渲染回测结果。
+
+        参数:
+            runs (list): 每个元素为包含 name、prices、total_asset、days、initial_balance 的字典，
+                         例如 TrainingPipeline.backtest 的结果加上价格和名称。
+            output_dir (str): 图片保存目录，文件名为 name.png。
+            processes (int): 进程数，默认为CPU核数。
+
+        返回:
+            files (list): 与 runs 顺序一致的图片路径。
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            futures = [executor.submit(_render_run, run, output_dir, max_points, dpi) for run in runs]
+            return [future.result() for future in futures]
@@ -0,0 +1,203 @@
+import argparse
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from Analytics import Analytics
+from FileIOClass import FileIOClass
+from InputHandler import InputHandler
+from SweepRunner import default_processes, init_worker
+
+
+def _run_fold(window, data_file, model_choice, parameters, learning_rate, total_timesteps):
+    """在子进程中训练并回测一个窗口。数据以内存映射方式打开，所有子进程共享同一份页缓存而不是各自复制。"""
+    from TrainingPipeline import TrainingPipeline
+
+    start = time.perf_counter()
+    dataset = FileIOClass().open_columnar(data_file)
+    train_data = dataset.slice(window["train_start"], window["train_end"]).drop(columns=['Date', 'Index'])
+    test_dataset = dataset.slice(window["test_start"], window["test_end"])
+
+    pipeline = TrainingPipeline(model_choice, parameters, learning_rate=learning_rate,
+                                total_timesteps=total_timesteps, verbose=0)
+    model = pipeline.train(train_data)
+    result = pipeline.backtest(model, test_dataset.drop(columns=['Date', 'Index']))
+
+    prices = np.asarray(test_dataset['Close'][result['days']], dtype=np.float64)
+    metrics = Analytics().summary(prices, result['total_asset'], result['portfolios'], parameters['initial_balance'])
+    return dict(window, days=window["test_start"] + result['days'], total_asset=result['total_asset'],
+                portfolios=result['portfolios'], prices=prices, metrics=metrics,
+                seconds=time.perf_counter() - start)
+
+
+class WalkForward:
+    """
+    滚动窗口（walk-forward）评估：在一段长历史上按 训练窗口 + 测试窗口 向前滑动，每个窗口重新训练并在紧随其后的测试期回测，
+    各窗口在进程池中并行运行，最后把各测试期的资产曲线拼接成一条连续的样本外曲线。
+    """
+
+    def __init__(self, data, model_choice, parameters, train_days=730, test_days=91, step_days=None,
+                 learning_rate=None, total_timesteps=50000, processes=None, threads_per_job=1,
+                 work_file="walk_forward_data.stk"):
+        """
+        参数:
+            data (str or pd.DataFrame): 列式数据文件路径（FileIOClass.write_columnar 写出），或行情DataFrame（会先写成列式文件）。
+            model_choice (str): "DQN" 或 "PPO"。
+            parameters (dict): 投资组合参数，格式与 InputHandler.get_portfolio_parameters 的返回值相同。
+            train_days (int): 训练窗口的天数，默认约2年。
+            test_days (int): 测试窗口的天数，默认约3个月。
+            step_days (int): 窗口每次向前移动的天数，默认等于 test_days（测试期首尾相接）；
+                             小于 test_days 时测试期互相重叠，拼接时每个窗口只取上一个窗口没有覆盖的天数；
+                             不能大于 test_days，否则测试期之间会有空档。
+            learning_rate (float): 学习率，默认使用 TrainingPipeline 的设置。
+            total_timesteps (int): 每个窗口的训练步数。
+            processes (int): 进程数，默认为可用CPU核数除以每个任务的线程数。
+            threads_per_job (int): 每个窗口中torch可使用的线程数。
+            work_file (str): data 为DataFrame时写出的列式文件路径。
+        """
+        if train_days < 2 or test_days < 2:
+            raise ValueError("训练窗口和测试窗口至少需要2天。")
+        if step_days is not None and not 0 < step_days <= test_days:
+            raise ValueError("step_days 必须在1到 test_days 之间，否则拼接后的样本外曲线会有空档。")
+        file_io = FileIOClass()
+        if not isinstance(data, str):
+            file_io.write_columnar(data, work_file)
+            data = work_file
+        if processes is None:
+            processes = default_processes(threads_per_job)
+        self.data_file = data
+        self.dataset = file_io.open_columnar(data)
+        self.model_choice = model_choice
+        self.parameters = parameters
+        self.train_days = train_days
+        self.test_days = test_days
+        self.step_days = step_days or test_days
+        self.learning_rate = learning_rate
+        self.total_timesteps = total_timesteps
+        self.processes = processes
+        self.threads_per_job = threads_per_job
+        self.analytics = Analytics()
+
+    def windows(self):
+        """
+        按行号划分的全部窗口，区间为左闭右开。
+
+        返回:
+            windows (list): 每个元素为 {fold, train_start, train_end, test_start, test_end}。
+        """
+        windows = []
+        start = 0
+        while start + self.train_days + self.test_days <= len(self.dataset):
+            train_end = start + self.train_days
+            windows.append({"fold": len(windows), "train_start": start, "train_end": train_end,
+                            "test_start": train_end, "test_end": train_end + self.test_days})
+            start += self.step_days
+        return windows
+
+    def run(self, output_file=None):
+        """
+        并行运行所有窗口。
+
+        参数:
+            output_file (str): 指定时把每个窗口的指标保存为CSV文件。
+
+        返回:
+            result (dict): folds（每个窗口的日期范围和回测指标）、拼接后的 days、dates、prices、total_asset 数组，
+                           以及拼接曲线的整体指标 metrics。
+        """
+        windows = self.windows()
+        if not windows:
+            raise ValueError("数据长度不足一个训练窗口加一个测试窗口。")
+        with ProcessPoolExecutor(max_workers=self.processes, initializer=init_worker,
+                                 initargs=(self.threads_per_job,)) as executor:
+            futures = [executor.submit(_run_fold, window, self.data_file, self.model_choice, self.parameters,
+                                       self.learning_rate, self.total_timesteps) for window in windows]
+            fold_results = []
+            for future in futures:
+                fold_results.append(future.result())
+                print(f"已完成 {len(fold_results)}/{len(windows)} 个窗口")
+
+        result = self.stitch(fold_results)
+        dates = self.dataset.index
+        rows = []
+        for fold in fold_results:
+            row = {"fold": fold["fold"],
+                   "train_start": str(dates[fold["train_start"]]), "train_end": str(dates[fold["train_end"] - 1]),
+                   "test_start": str(dates[fold["test_start"]]), "test_end": str(dates[fold["test_end"] - 1]),
+                   "seconds": fold["seconds"]}
+            row.update(fold["metrics"])
+            rows.append(row)
+        result["folds"] = pd.DataFrame(rows)
+        result["dates"] = dates[result["days"]]
+        if output_file:
+            result["folds"].to_csv(output_file, index=False)
+        return result
+
+    def stitch(self, fold_results):
+        """
+        把各测试期的资产曲线首尾相接：每个窗口都从初始资金开始回测，按上一段的期末资产等比例缩放后拼接，
+        相当于把资金连续滚动投入每一个测试期。测试期重叠时每个窗口只保留下一个窗口开始之前的天数，
+        拼接后的交易日严格递增，同一段行情不会被重复计入收益。
+        """
+        initial_balance = self.parameters['initial_balance']
+        level = float(initial_balance)
+        folds = sorted(fold_results, key=lambda fold: fold["fold"])
+        days, prices, total_asset, portfolios = [], [], [], []
+        for i, fold in enumerate(folds):
+            keep = slice(None)
+            if i + 1 < len(folds):
+                keep = np.asarray(fold["days"]) < folds[i + 1]["test_start"]
+            scale = level / initial_balance
+            days.append(np.asarray(fold["days"])[keep])
+            prices.append(np.asarray(fold["prices"])[keep])
+            total_asset.append(np.asarray(fold["total_asset"], dtype=np.float64)[keep] * scale)
+            portfolios.append(np.asarray(fold["portfolios"], dtype=np.float64)[keep] * scale)
+            if len(total_asset[-1]):
+                level = total_asset[-1][-1]
+        result = {"days": np.concatenate(days), "prices": np.concatenate(prices),
+                  "total_asset": np.concatenate(total_asset), "portfolios": np.concatenate(portfolios)}
+        result["metrics"] = self.analytics.summary(result["prices"], result["total_asset"], result["portfolios"],
+                                                   initial_balance)
+        return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="滚动窗口训练和样本外回测")
+    parser.add_argument("--data", default=None, help="列式数据文件，不指定时按下面的参数生成")
+    parser.add_argument("--symbol", default="AAPL")
+    parser.add_argument("--start-date", default="2010-01-01")
+    parser.add_argument("--end-date", default="2019-12-31")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--model", default="DQN", choices=["DQN", "PPO"])
+    parser.add_argument("--train-days", type=int, default=730)
+    parser.add_argument("--test-days", type=int, default=91)
+    parser.add_argument("--step-days", type=int, default=None)
+    parser.add_argument("--timesteps", type=int, default=50000, help="每个窗口的训练步数")
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--threads-per-job", type=int, default=1)
+    parser.add_argument("--output", default="walk_forward_folds.csv", help="每个窗口指标的CSV")
+    parser.add_argument("--curve", default="walk_forward_curve.csv", help="拼接后样本外曲线的CSV")
+    parser.add_argument("--plot", default="walk_forward.png", help="样本外曲线图片")
+    handler = InputHandler()
+    handler.add_portfolio_arguments(parser)
+    args = parser.parse_args()
+
+    data = args.data
+    if data is None:
+        from DataGenerationAndManagementClass import DataGenerationAndManagementClass
+        data = DataGenerationAndManagementClass().generate_stock_data_vectorized(args.symbol, args.start_date,
+                                                                                args.end_date, seed=args.seed)
+    parameters = handler.portfolio_parameters_from_args(args)
+    walk_forward = WalkForward(data, args.model, parameters, train_days=args.train_days, test_days=args.test_days,
+                               step_days=args.step_days, total_timesteps=args.timesteps, processes=args.processes,
+                               threads_per_job=args.threads_per_job)
+    result = walk_forward.run(output_file=args.output)
+    pd.DataFrame({"Date": result["dates"].astype(str), "Close": result["prices"],
+                  "total_asset": result["total_asset"]}).to_csv(args.curve, index=False)
+    print(result["folds"])
+    for name, value in result["metrics"].items():
+        print(f"{name}: {value:.4f}")
+
+    from Visualization import Visualizer
+    Visualizer().render(result["prices"], result["total_asset"], result["days"], parameters['initial_balance'],
+                        output_file=args.plot)